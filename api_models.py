@@ -1,9 +1,33 @@
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 from groq import Groq
 import assemblyai as aai
-from typing import Optional
+from typing import Optional, List, Iterator, Union, Callable, Dict, Any, Tuple
+from clients import get_groq_client, get_transcriber
+from token_budget import (prompt_budget, count_tokens, estimate_tokens, pack_text, chunk_by_tokens,
+                          MESSAGE_OVERHEAD_TOKENS)
+from rate_limiter import get_scheduler, RetryableError
+from transcript_cache import get_transcript_cache, hash_audio_file, make_cache_key
+from word_index import WordIndex
+from response_cache import get_response_cache, make_request_key
+from metrics import span, get_metrics
+from keyword_utils import rank_keywords
+from audio_preprocess import (preprocess_audio, format_savings, find_ffmpeg, detect_silences, plan_segments,
+                              split_audio, SPLIT_SILENCE_THRESHOLD_DB, SPLIT_MIN_SILENCE_SECONDS)
+
+# Settings passed to aai.TranscriptionConfig; also part of the transcript cache key
+TRANSCRIPTION_SETTINGS = {
+    "speech_models": ["universal-3-pro"],
+    "language_code": "en",
+    "punctuate": True,
+    "format_text": True,
+}
+
+SEGMENT_MIN_SECONDS = 1200  # Shorter recordings are transcribed in one piece
+SEGMENT_MAX_SECONDS = 600  # Maximum length of one segment
+SEGMENT_MAX_WORKERS = 4  # Segments transcribed at the same time
 
 def get_api_key(key_name: str) -> str:
     """
@@ -20,81 +44,261 @@ def get_api_key(key_name: str) -> str:
     except (KeyError, FileNotFoundError):
         raise ValueError(f"API key '{key_name}' not found in environment or secrets")
 
-def transcribe_audio(audio_path: str, max_retries: int = 3) -> Optional[str]:
+def _transcribe_file(transcriber: aai.Transcriber, audio_path: str, max_retries: int,
+                     label: str = "Transcription", allow_empty: bool = False) -> aai.Transcript:
     """
-    Transcribe audio file using AssemblyAI with retry logic
+    Upload and transcribe one file through the AssemblyAI scheduler
     
     Args:
-        audio_path: Path to the audio file
+        transcriber: Shared transcriber
+        audio_path: File to transcribe
         max_retries: Maximum number of retry attempts
+        label: Name used in log and error messages
+        allow_empty: Accept an empty transcript (e.g. a segment without speech)
         
     Returns:
-        Transcribed text or None if failed
+        The completed transcript
     """
-    try:
-        api_key = get_api_key("ASSEMBLYAI_API_KEY")
-        aai.settings.api_key = api_key
+    def attempt_transcription():
+        # Upload and submit, then wait for the transcript
+        with span('upload', bytes=os.path.getsize(audio_path)):
+            transcript = transcriber.submit(audio_path)
+        transcript = transcript.wait_for_completion()
         
-        config = aai.TranscriptionConfig(
-            speech_models=["universal-3-pro"],
-            language_code="en",
-            punctuate=True,
-            format_text=True,
-        )
+        # Check status; a failed job (e.g. unreadable audio) fails the same way again
+        if transcript.status == aai.TranscriptStatus.error:
+            error_msg = transcript.error if hasattr(transcript, 'error') else "Unknown error"
+            raise Exception(f"Transcription failed: {error_msg}")
         
-        transcriber = aai.Transcriber(config=config)
+        if not transcript.text and not allow_empty:
+            raise RetryableError("Transcription returned empty text")
+        return transcript
+    
+    return get_scheduler('assemblyai').call(attempt_transcription, max_retries=max_retries, label=label)
+
+def stitch_segments(segment_words: List[List[Dict[str, Any]]], segments: List[Dict[str, float]],
+                    offset_seconds: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Join word timestamps from overlapping segments into one timeline
+    
+    Word times are shifted by their segment's start. Where segments
+    overlap, a word is kept only by the segment whose cut range contains
+    the middle of the word, so nothing is duplicated or lost at a cut.
+    
+    Args:
+        segment_words: Words of each segment (text, start, end in ms relative to the segment)
+        segments: Segments from audio_preprocess.plan_segments, in the same order
+        offset_seconds: Audio trimmed before the segmented file started
         
-        for attempt in range(max_retries):
-            try:
-                # Upload and transcribe
-                transcript = transcriber.transcribe(audio_path)
-                
-                # Check status
-                if transcript.status == aai.TranscriptStatus.error:
-                    error_msg = transcript.error if hasattr(transcript, 'error') else "Unknown error"
-                    raise Exception(f"Transcription failed: {error_msg}")
-                
-                # Return text if successful
-                if transcript.text:
-                    return transcript.text
-                else:
-                    raise Exception("Transcription returned empty text")
-                    
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2  # Exponential backoff
-                    print(f"Transcription attempt {attempt + 1} failed: {str(e)}. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    raise Exception(f"Transcription failed after {max_retries} attempts: {str(e)}")
+    Returns:
+        Words with start and end in ms relative to the original recording
+    """
+    stitched = []
+    for index, (words, segment) in enumerate(zip(segment_words, segments)):
+        base = segment['start'] * 1000
+        cut_start = segment['cut_start'] * 1000
+        cut_end = segment['cut_end'] * 1000
+        is_last = index == len(segments) - 1
+        for word in words:
+            start = word['start'] + base
+            end = word['end'] + base
+            middle = (start + end) / 2
+            if middle < cut_start or middle > cut_end or (middle == cut_end and not is_last):
+                continue
+            stitched.append({
+                **word,
+                'start': int(round(start + offset_seconds * 1000)),
+                'end': int(round(end + offset_seconds * 1000)),
+            })
+    return stitched
+
+def plan_transcription_segments(audio_path: str, force: bool = False) -> Optional[List[Dict[str, float]]]:
+    """
+    Decide whether and where to split a recording for parallel transcription
+    
+    Args:
+        audio_path: Recording (usually the preprocessed file)
+        force: Split even if the recording is shorter than LECTUREAI_SEGMENT_MIN_SECONDS
         
+    Returns:
+        Segments from audio_preprocess.plan_segments, or None if the
+        recording is not worth splitting (or ffmpeg is missing)
+    """
+    if not find_ffmpeg():
+        return None
+    
+    min_seconds = float(os.getenv("LECTUREAI_SEGMENT_MIN_SECONDS", SEGMENT_MIN_SECONDS))
+    max_seconds = float(os.getenv("LECTUREAI_SEGMENT_SECONDS", SEGMENT_MAX_SECONDS))
+    
+    try:
+        silences, duration = detect_silences(audio_path, threshold_db=SPLIT_SILENCE_THRESHOLD_DB,
+                                             min_silence=SPLIT_MIN_SILENCE_SECONDS)
+    except Exception as e:
+        # AssemblyAI may still accept what ffmpeg cannot read; upload it in one piece
+        print(f"Could not analyse audio for splitting: {str(e)}")
+        return None
+    if duration is None or (duration < min_seconds and not force):
         return None
+    segments = plan_segments(silences, duration, max_seconds=max_seconds)
+    if len(segments) < 2:
+        return None
+    
+    print(f"Transcribing {duration / 60:.1f} min of audio as {len(segments)} segments")
+    return segments
+
+def word_dicts(words) -> List[Dict[str, Any]]:
+    """Convert AssemblyAI Word objects into plain dictionaries"""
+    return [{'text': w.text, 'start': w.start, 'end': w.end, 'confidence': w.confidence} for w in (words or [])]
+
+def _transcribe_segmented(transcriber: aai.Transcriber, audio_path: str, max_retries: int,
+                          force: bool = False, offset_seconds: float = 0.0) -> Optional[Dict[str, Any]]:
+    """
+    Split a long recording at pauses and transcribe the segments in parallel
+    
+    Args:
+        transcriber: Shared transcriber
+        audio_path: Recording (usually the preprocessed file)
+        max_retries: Maximum number of retry attempts per segment
+        force: Split even if the recording is shorter than LECTUREAI_SEGMENT_MIN_SECONDS
+        offset_seconds: Audio trimmed from the start of the original recording
+        
+    Returns:
+        Dictionary with text, words and transcript_ids, or None if the
+        recording is not worth splitting (or ffmpeg is missing)
+    """
+    segments = plan_transcription_segments(audio_path, force=force)
+    if segments is None:
+        return None
+    
+    max_workers = int(os.getenv("LECTUREAI_SEGMENT_WORKERS", SEGMENT_MAX_WORKERS))
+    paths = split_audio(audio_path, segments)
+    try:
+        def run(index: int) -> aai.Transcript:
+            return _transcribe_file(transcriber, paths[index], max_retries,
+                                    label=f"Segment {index + 1} transcription", allow_empty=True)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segments)))) as executor:
+            transcripts = list(executor.map(run, range(len(segments))))
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
+    
+    words = stitch_segments([word_dicts(t.words) for t in transcripts], segments, offset_seconds)
+    text = ' '.join(w['text'] for w in words)
+    if not text:
+        raise Exception("Transcription returned empty text")
+    
+    return {'text': text, 'words': words, 'transcript_ids': [t.id for t in transcripts]}
+
+def cached_word_index(cache_key: str) -> Optional[WordIndex]:
+    """Word timestamps stored in the transcript cache, if any"""
+    data = get_transcript_cache().get_words(cache_key)
+    if not data:
+        return None
+    try:
+        return WordIndex.from_bytes(data)
+    except ValueError as e:
+        print(f"Ignoring cached word index: {str(e)}")
+        return None
+
+def transcribe_audio_with_words(audio_path: str, max_retries: int = 3, use_cache: bool = True,
+                                preprocess: bool = True,
+                                segmented: Optional[bool] = None) -> Tuple[Optional[str], Optional[WordIndex]]:
+    """
+    Transcribe audio file and keep the word-level timestamps
+    
+    Same as transcribe_audio, but also returns every word with its start
+    and end time in the original recording, as a compact WordIndex.
+    
+    Returns:
+        Tuple of (transcribed text, word index); the index is None for
+        cached transcripts stored before word indexes were kept
+    """
+    prepared = None
+    try:
+        cache_key = None
+        if use_cache:
+            cache = get_transcript_cache()
+            cache_key = make_cache_key(hash_audio_file(audio_path), TRANSCRIPTION_SETTINGS)
+            cached = cache.get(cache_key)
+            if cached and cached.get('text'):
+                return cached['text'], cached_word_index(cache_key)
+        
+        api_key = get_api_key("ASSEMBLYAI_API_KEY")
+        transcriber = get_transcriber(api_key, TRANSCRIPTION_SETTINGS)
+        
+        upload_path = audio_path
+        offset_seconds = 0.0
+        if preprocess:
+            prepared = preprocess_audio(audio_path)
+            upload_path = prepared['path']
+            offset_seconds = prepared['offset_seconds']
+            print(f"{os.path.basename(audio_path)}: {format_savings(prepared)}")
+        
+        with span('transcription', bytes=os.path.getsize(upload_path)) as stage:
+            result = None
+            if segmented is not False:
+                result = _transcribe_segmented(transcriber, upload_path, max_retries,
+                                               force=segmented is True, offset_seconds=offset_seconds)
+            if result is None:
+                transcript = _transcribe_file(transcriber, upload_path, max_retries)
+                result = {
+                    'text': transcript.text,
+                    'words': WordIndex.from_words(transcript.words, offset_ms=round(offset_seconds * 1000)),
+                    'transcript_ids': [transcript.id],
+                }
+            else:
+                result['words'] = WordIndex.from_words(result['words'])
+            stage.update(segments=len(result['transcript_ids']), characters=len(result['text']),
+                         words=len(result['words']))
+        
+        if cache_key:
+            cache.put(cache_key, {'text': result['text'], 'transcript_ids': result['transcript_ids']})
+            if len(result['words']):
+                cache.put_words(cache_key, result['words'].to_bytes())
+        return result['text'], result['words']
         
     except Exception as e:
         print(f"Error in transcription: {str(e)}")
         raise
+    
+    finally:
+        if prepared and prepared['processed'] and os.path.exists(prepared['path']):
+            os.unlink(prepared['path'])
 
-def generate_notes(transcript: str, max_retries: int = 3) -> Optional[str]:
+def transcribe_audio(audio_path: str, max_retries: int = 3, use_cache: bool = True,
+                     preprocess: bool = True, segmented: Optional[bool] = None) -> Optional[str]:
     """
-    Generate structured notes from transcript using Groq
+    Transcribe audio file using AssemblyAI with retry logic
+    
+    Recordings longer than LECTUREAI_SEGMENT_MIN_SECONDS are split at
+    pauses and the segments are transcribed concurrently, so a two-hour
+    lecture takes roughly as long as its longest segment.
     
     Args:
-        transcript: The transcribed text
+        audio_path: Path to the audio file
         max_retries: Maximum number of retry attempts
+        use_cache: Reuse a stored transcript when the same audio was transcribed before
+        preprocess: Shrink the audio with ffmpeg (mono, 16 kHz, silence trimmed) before upload
+        segmented: True to always split, False to never split, None to split long recordings
         
     Returns:
-        Generated notes or None if failed
+        Transcribed text or None if failed
     """
-    try:
-        api_key = get_api_key("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
-        
-        # Truncate transcript if too long (Groq has token limits)
-        max_chars = 30000  # Conservative limit
-        if len(transcript) > max_chars:
-            transcript = transcript[:max_chars] + "\n\n[Transcript truncated due to length]"
-        
-        system_prompt = """You are an expert academic note-taker and learning scientist. Your task is to transform lecture transcripts into comprehensive, well-structured study notes.
+    text, _ = transcribe_audio_with_words(audio_path, max_retries, use_cache, preprocess, segmented)
+    return text
+
+NOTES_MODEL = "llama-3.3-70b-versatile"
+NOTES_MAX_TOKENS = 8000  # Completion budget for the final notes
+CHUNK_NOTES_MAX_TOKENS = 4000  # Completion budget for each partial note
+NOTES_MAX_WORKERS = 4  # Concurrent Groq requests in chunked mode
+TRUNCATION_MARKER = "\n\n[Transcript truncated due to length]"
+
+# Yielded by stream_notes when a failed attempt is retried; discard the text received so far
+STREAM_RESTART = object()
+
+NOTES_SYSTEM_PROMPT = """You are an expert academic note-taker and learning scientist. Your task is to transform lecture transcripts into comprehensive, well-structured study notes.
 
 Create notes that include:
 
@@ -122,7 +326,17 @@ Create notes that include:
 
 Format the notes using clear markdown with proper headings, bullet points, and emphasis where appropriate. Make the notes scannable and easy to review."""
 
-        user_prompt = f"""Please create comprehensive study notes from the following lecture transcript:
+CHUNK_NOTES_SYSTEM_PROMPT = """You are an expert academic note-taker. You will receive one part of a longer lecture transcript.
+
+Write detailed notes for this part only:
+- Core concepts, theories, principles and definitions, with their explanations
+- Important details, methodologies, processes and procedures
+- Numerical data, statistics and specific examples, preserved exactly
+- Real-world applications, case studies and problem-solving examples
+
+Use concise markdown bullet points grouped under short headings. Do not add an overview, takeaways or review questions; these notes will be merged with notes from the other parts of the lecture."""
+
+NOTES_PROMPT_TEMPLATE = """Please create comprehensive study notes from the following lecture transcript:
 
 ---
 {transcript}
@@ -130,114 +344,518 @@ Format the notes using clear markdown with proper headings, bullet points, and e
 
 Generate well-structured, academic-quality notes following the format specified."""
 
+CHUNK_NOTES_PROMPT_TEMPLATE = """This is part {part} of {total} of {source}:
+
+---
+{text}
+---
+
+Write detailed notes for this part."""
+
+MERGE_NOTES_PROMPT_TEMPLATE = """The following are notes taken from consecutive parts of a single lecture:
+
+---
+{notes}
+---
+
+Merge them into one set of comprehensive study notes covering the whole lecture. Remove repetition between parts, keep every important detail, and follow the format specified."""
+
+def _notes_budget() -> int:
+    """Transcript tokens that fit into a single notes request"""
+    return prompt_budget(NOTES_MODEL, [NOTES_SYSTEM_PROMPT, NOTES_PROMPT_TEMPLATE.format(transcript="")],
+                         NOTES_MAX_TOKENS)
+
+def _chunk_notes_budget() -> int:
+    """Text tokens that fit into a single partial-notes request"""
+    template = CHUNK_NOTES_PROMPT_TEMPLATE.format(part=0, total=0, source="the notes taken from a lecture", text="")
+    return prompt_budget(NOTES_MODEL, [CHUNK_NOTES_SYSTEM_PROMPT, template], CHUNK_NOTES_MAX_TOKENS)
+
+def _merge_notes_budget() -> int:
+    """Partial-note tokens that fit into the final merge request"""
+    return prompt_budget(NOTES_MODEL, [NOTES_SYSTEM_PROMPT, MERGE_NOTES_PROMPT_TEMPLATE.format(notes="")],
+                         NOTES_MAX_TOKENS)
+
+def _request_tokens(messages: List[dict], max_tokens: int) -> int:
+    """Tokens a chat request can consume: the estimated prompt plus the completion budget"""
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages) + max_tokens
+
+def _usage_tokens(chat_completion) -> Optional[int]:
+    """Actual tokens used by a chat completion, if the response reports it"""
+    usage = getattr(chat_completion, 'usage', None)
+    return getattr(usage, 'total_tokens', None)
+
+def _chat_completion(client: Groq, messages: List[dict], model: str, temperature: float, max_tokens: int,
+                     top_p: Optional[float] = None, max_retries: int = 3, label: str = "Request",
+                     validate: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Run one chat completion through the response cache and the Groq scheduler
+    
+    Identical requests (same model, messages and sampling parameters) are
+    answered from the response cache without calling Groq.
+    
+    Args:
+        client: Groq client
+        messages: Chat messages
+        model: Model name
+        temperature: Sampling temperature
+        max_tokens: Completion token limit
+        top_p: Nucleus sampling parameter (None leaves the API default)
+        max_retries: Maximum number of retry attempts
+        label: Name used in log and error messages
+        validate: Optional check that raises RetryableError for an unusable response
+        
+    Returns:
+        The completion text
+    """
+    cache = get_response_cache()
+    cache_key = make_request_key(model, messages, temperature, top_p, max_tokens) if cache else None
+    if cache_key:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    params = {"messages": messages, "model": model, "temperature": temperature, "max_tokens": max_tokens}
+    if top_p is not None:
+        params["top_p"] = top_p
+    
+    def attempt_completion():
+        chat_completion = client.chat.completions.create(**params)
+        content = chat_completion.choices[0].message.content
+        if validate:
+            validate(content)
+        return content, _usage_tokens(chat_completion)
+    
+    start = time.perf_counter()
+    request_tokens = _request_tokens(messages, max_tokens)
+    with span('groq_request', model=model, label=label, prompt_tokens=request_tokens - max_tokens) as stage:
+        content, used = get_scheduler('groq').call(
+            attempt_completion,
+            tokens=request_tokens,
+            max_retries=max_retries,
+            label=label,
+            used_tokens=lambda result: result[1],
+        )
+        stage['tokens'] = used
+    
+    if cache_key:
+        cache.put(cache_key, content, tokens=used, seconds=time.perf_counter() - start)
+    return content
+
+def _validate_notes(notes: Optional[str]) -> None:
+    """Reject notes that are too short to be real notes"""
+    if not notes or len(notes.strip()) <= 100:
+        raise RetryableError("Generated notes are too short or empty")
+
+def _complete_notes(client: Groq, system_prompt: str, user_prompt: str, max_retries: int,
+                    max_tokens: int = NOTES_MAX_TOKENS, label: str = "Note generation") -> str:
+    """
+    Run one notes completion with retry logic
+    
+    Args:
+        client: Groq client
+        system_prompt: System message
+        user_prompt: User message
+        max_retries: Maximum number of retry attempts
+        max_tokens: Completion token limit
+        label: Name used in log and error messages
+        
+    Returns:
+        Generated notes
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    
+    return _chat_completion(client, messages, NOTES_MODEL, temperature=0.3, max_tokens=max_tokens, top_p=0.9,
+                            max_retries=max_retries, label=label, validate=_validate_notes)
+
+def _map_notes(client: Groq, chunks: List[str], max_retries: int, max_workers: int,
+               source: str = "a lecture transcript") -> List[str]:
+    """
+    Generate partial notes for each transcript chunk in parallel
+    
+    Args:
+        client: Groq client (thread-safe, shared by all workers)
+        chunks: Transcript chunks in lecture order
+        max_retries: Maximum number of retry attempts per chunk
+        max_workers: Maximum number of concurrent requests
+        source: What the chunks are, as described to the model
+        
+    Returns:
+        Partial notes in the same order as chunks
+    """
+    def run(index: int) -> str:
+        user_prompt = CHUNK_NOTES_PROMPT_TEMPLATE.format(
+            part=index + 1, total=len(chunks), source=source, text=chunks[index]
+        )
+        return _complete_notes(client, CHUNK_NOTES_SYSTEM_PROMPT, user_prompt, max_retries,
+                               max_tokens=CHUNK_NOTES_MAX_TOKENS, label=f"Chunk {index + 1} note generation")
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        return list(executor.map(run, range(len(chunks))))
+
+def _reduce_prompt(client: Groq, partial_notes: List[str], max_retries: int, max_workers: int) -> str:
+    """
+    Build the prompt that merges partial notes into the final OVERVIEW / KEY CONCEPTS / ... structure
+    
+    If the partial notes together are still too long for one request, they
+    are merged in groups first and the merged groups are reduced again.
+    
+    Args:
+        client: Groq client
+        partial_notes: Partial notes in lecture order
+        max_retries: Maximum number of retry attempts per request
+        max_workers: Maximum number of concurrent requests
+        
+    Returns:
+        User prompt for the final merge request
+    """
+    merge_budget = _merge_notes_budget()
+    group_budget = _chunk_notes_budget()
+    sections = [f"### Part {i + 1}\n\n{notes}" for i, notes in enumerate(partial_notes)]
+    combined = "\n\n".join(sections)
+    
+    while estimate_tokens(combined) > merge_budget and len(sections) > 1:
+        groups = []
+        group_tokens = []
+        for section in sections:
+            tokens = estimate_tokens(section)
+            if groups and group_tokens[-1] + tokens <= group_budget:
+                groups[-1] += "\n\n" + section
+                group_tokens[-1] += tokens
+            else:
+                groups.append(section)
+                group_tokens.append(tokens)
+        if len(groups) == len(sections):
+            # Every section is too long to pair up; the final pass gets them as-is
+            break
+        merged = _map_notes(client, groups, max_retries, max_workers,
+                            source="the notes taken from a lecture")
+        sections = [f"### Part {i + 1}\n\n{notes}" for i, notes in enumerate(merged)]
+        combined = "\n\n".join(sections)
+    
+    return MERGE_NOTES_PROMPT_TEMPLATE.format(notes=combined)
+
+def _notes_prompt(client: Groq, transcript: str, max_retries: int, chunked: bool, max_workers: int) -> str:
+    """
+    Build the user prompt for the final notes request
+    
+    Transcripts that do not fit the model's context window (next to the
+    system prompt and NOTES_MAX_TOKENS) are split on sentence boundaries
+    and turned into partial notes in parallel (map); the returned prompt
+    then merges them (reduce). Transcripts that fit are sent as they are.
+    
+    Returns:
+        User prompt to send with NOTES_SYSTEM_PROMPT
+    """
+    budget = _notes_budget()
+    
+    if count_tokens(transcript) > budget:
+        if chunked:
+            chunks = chunk_by_tokens(transcript, _chunk_notes_budget())
+            partial_notes = _map_notes(client, chunks, max_retries, max_workers)
+            return _reduce_prompt(client, partial_notes, max_retries, max_workers)
+        
+        transcript = pack_text(transcript, budget - estimate_tokens(TRUNCATION_MARKER)) + TRUNCATION_MARKER
+    
+    return NOTES_PROMPT_TEMPLATE.format(transcript=transcript)
+
+def generate_notes(transcript: str, max_retries: int = 3, chunked: bool = True,
+                   max_workers: int = NOTES_MAX_WORKERS) -> Optional[str]:
+    """
+    Generate structured notes from transcript using Groq
+    
+    Transcripts too long for one request are split on sentence
+    boundaries, the chunks are turned into partial notes in parallel
+    (map) and the partial notes are merged in a final pass (reduce).
+    
+    Args:
+        transcript: The transcribed text
+        max_retries: Maximum number of retry attempts
+        chunked: Use map-reduce for long transcripts instead of truncating them
+        max_workers: Maximum number of concurrent requests in chunked mode
+        
+    Returns:
+        Generated notes or None if failed
+    """
+    try:
+        api_key = get_api_key("GROQ_API_KEY")
+        client = get_groq_client(api_key)
+        
+        user_prompt = _notes_prompt(client, transcript, max_retries, chunked, max_workers)
+        return _complete_notes(client, NOTES_SYSTEM_PROMPT, user_prompt, max_retries)
+        
+    except Exception as e:
+        print(f"Error in note generation: {str(e)}")
+        raise
+
+def stream_notes(transcript: str, max_retries: int = 3, chunked: bool = True,
+                 max_workers: int = NOTES_MAX_WORKERS) -> Iterator[Union[str, object]]:
+    """
+    Generate structured notes, yielding text as Groq produces it
+    
+    Retries follow generate_notes: up to max_retries attempts, paced by
+    the shared Groq scheduler. If an attempt fails after text was already yielded,
+    STREAM_RESTART is yielded before the next attempt, and the caller
+    should discard what it has received so far. In chunked mode the
+    partial notes are generated first and only the final merge streams.
+    
+    Args:
+        transcript: The transcribed text
+        max_retries: Maximum number of retry attempts
+        chunked: Use map-reduce for long transcripts instead of truncating them
+        max_workers: Maximum number of concurrent requests in chunked mode
+        
+    Yields:
+        Text chunks of the notes, or STREAM_RESTART
+    """
+    try:
+        api_key = get_api_key("GROQ_API_KEY")
+        client = get_groq_client(api_key)
+        
+        user_prompt = _notes_prompt(client, transcript, max_retries, chunked, max_workers)
+        messages = [
+            {"role": "system", "content": NOTES_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+        
+        cache = get_response_cache()
+        cache_key = make_request_key(NOTES_MODEL, messages, 0.3, 0.9, NOTES_MAX_TOKENS) if cache else None
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        scheduler = get_scheduler('groq')
+        start = time.perf_counter()
+        
         for attempt in range(max_retries):
+            emitted = []
             try:
-                chat_completion = client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    model="llama-3.3-70b-versatile",
+                attempt_start = time.perf_counter()
+                scheduler.acquire(_request_tokens(messages, NOTES_MAX_TOKENS))
+                stream = client.chat.completions.create(
+                    messages=messages,
+                    model=NOTES_MODEL,
                     temperature=0.3,
-                    max_tokens=8000,
+                    max_tokens=NOTES_MAX_TOKENS,
                     top_p=0.9,
+                    stream=True,
                 )
                 
-                notes = chat_completion.choices[0].message.content
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        emitted.append(delta)
+                        yield delta
                 
-                if notes and len(notes.strip()) > 100:
-                    return notes
-                else:
-                    raise Exception("Generated notes are too short or empty")
+                notes = ''.join(emitted)
+                prompt_tokens = _request_tokens(messages, 0)
+                get_metrics().record('groq_stream', time.perf_counter() - attempt_start, model=NOTES_MODEL,
+                                     prompt_tokens=prompt_tokens, tokens=prompt_tokens + estimate_tokens(notes))
+                _validate_notes(notes)
+                if cache_key:
+                    cache.put(cache_key, notes, seconds=time.perf_counter() - start)
+                return
                     
             except Exception as e:
+                wait_time = scheduler.retry_delay(e, attempt)
+                if wait_time is None:
+                    raise Exception(f"Note generation failed: {str(e)}") from e
                 if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"Note generation attempt {attempt + 1} failed: {str(e)}. Retrying in {wait_time}s...")
+                    print(f"Note generation attempt {attempt + 1} failed: {str(e)}. Retrying in {wait_time:.1f}s...")
                     time.sleep(wait_time)
+                    if emitted:
+                        yield STREAM_RESTART
                 else:
                     raise Exception(f"Note generation failed after {max_retries} attempts: {str(e)}")
         
-        return None
-        
     except Exception as e:
         print(f"Error in note generation: {str(e)}")
         raise
 
-def extract_keywords(text: str, max_keywords: int = 10) -> list:
+KEYWORDS_MODEL = "llama-3.3-70b-versatile"
+KEYWORDS_MAX_TOKENS = 200
+KEYWORDS_BACKENDS = ('local', 'refine', 'llm')
+REFINE_CANDIDATES_FACTOR = 3  # Local candidates offered to the model per requested keyword
+REFINE_CONTEXT_TOKENS = 2000  # Transcript excerpt sent along with the candidates
+
+KEYWORDS_PROMPT_TEMPLATE = """Extract the {max_keywords} most important keywords, terms, or concepts from this text. 
+Return only the keywords as a comma-separated list, nothing else.
+
+Text:
+{text}"""
+
+REFINE_KEYWORDS_PROMPT_TEMPLATE = """These candidate keywords were extracted automatically from a lecture:
+{candidates}
+
+Choose the {max_keywords} most important keywords, terms, or concepts. You may merge duplicates and fix spelling or capitalization, but do not invent new terms.
+Return only the keywords as a comma-separated list, nothing else.
+
+Beginning of the lecture:
+{text}"""
+
+def _llm_keywords(messages: List[Dict[str, str]], max_keywords: int, label: str) -> list:
+    """Run a keyword prompt and parse the comma-separated answer"""
+    client = get_groq_client(get_api_key("GROQ_API_KEY"))
+    keywords_str = _chat_completion(client, messages, KEYWORDS_MODEL, temperature=0.2,
+                                    max_tokens=KEYWORDS_MAX_TOKENS, label=label).strip()
+    keywords = [k.strip() for k in keywords_str.split(',') if k.strip()]
+    return keywords[:max_keywords]
+
+def extract_keywords(text: str, max_keywords: int = 10, backend: Optional[str] = None) -> list:
     """
     Extract key terms and concepts from text
     
+    The local backend ranks keywords with keyword_utils.rank_keywords in
+    milliseconds. 'refine' additionally asks the model to pick the best of
+    the local candidates, and 'llm' sends the transcript to the model.
+    
     Args:
         text: Input text
         max_keywords: Maximum number of keywords to extract
+        backend: 'local', 'refine' or 'llm' (LECTUREAI_KEYWORDS_BACKEND, default
+            local); an unknown backend falls back to local
         
     Returns:
         List of keywords
     """
+    backend = (backend or os.getenv("LECTUREAI_KEYWORDS_BACKEND", "local")).lower()
+    if backend not in KEYWORDS_BACKENDS:
+        print(f"Unsupported keyword backend '{backend}', expected one of {', '.join(KEYWORDS_BACKENDS)}; using local")
+        backend = 'local'
+    
+    local_keywords = []
+    if backend != 'llm':
+        try:
+            local_keywords = rank_keywords(text, top_n=max_keywords * REFINE_CANDIDATES_FACTOR)
+        except Exception as e:
+            print(f"Error ranking keywords: {str(e)}")
+        if backend == 'local' or not local_keywords:
+            return local_keywords[:max_keywords]
+    
     try:
-        api_key = get_api_key("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
+        if backend == 'refine':
+            template = REFINE_KEYWORDS_PROMPT_TEMPLATE.format(
+                candidates=", ".join(local_keywords), max_keywords=max_keywords, text=""
+            )
+            budget = min(REFINE_CONTEXT_TOKENS, prompt_budget(KEYWORDS_MODEL, [template], KEYWORDS_MAX_TOKENS))
+            prompt = REFINE_KEYWORDS_PROMPT_TEMPLATE.format(
+                candidates=", ".join(local_keywords), max_keywords=max_keywords, text=pack_text(text, budget)
+            )
+            label = "Keyword refinement"
+        else:
+            # Pack as much text as fits next to the prompt and the completion budget
+            budget = prompt_budget(KEYWORDS_MODEL, [KEYWORDS_PROMPT_TEMPLATE.format(max_keywords=max_keywords, text="")],
+                                   KEYWORDS_MAX_TOKENS)
+            prompt = KEYWORDS_PROMPT_TEMPLATE.format(max_keywords=max_keywords, text=pack_text(text, budget))
+            label = "Keyword extraction"
         
-        # Truncate if too long
-        if len(text) > 10000:
-            text = text[:10000]
+        messages = [{"role": "user", "content": prompt}]
+        return _llm_keywords(messages, max_keywords, label) or local_keywords[:max_keywords]
         
-        prompt = f"""Extract the {max_keywords} most important keywords, terms, or concepts from this text. 
-Return only the keywords as a comma-separated list, nothing else.
+    except Exception as e:
+        print(f"Error extracting keywords: {str(e)}")
+        # Refinement is optional; the local ranking still stands
+        return local_keywords[:max_keywords]
+
+SUMMARY_MODEL = "llama-3.3-70b-versatile"
+SUMMARY_MAX_TOKENS = 500
+SUMMARY_CHUNK_TOKENS = 6000  # Longer texts are summarized hierarchically in chunks of this size
+SUMMARY_CHUNK_WORDS = 150  # Length of each chunk-level summary
+SUMMARY_CHUNK_MAX_TOKENS = 400
+
+SUMMARY_PROMPT_TEMPLATE = """Create a concise summary (maximum {max_length} words) of the following text. 
+Focus on the main points and key information.
 
 Text:
 {text}"""
 
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.2,
-            max_tokens=200,
+CHUNK_SUMMARY_PROMPT_TEMPLATE = """This is part {part} of {total} of {source}. Summarize this part in at most {max_length} words.
+Focus on the main points and key information; do not add an introduction or conclusion.
+
+Text:
+{text}"""
+
+def _summary_max_tokens(max_length: int) -> int:
+    """Completion budget for a summary of max_length words"""
+    return max(SUMMARY_MAX_TOKENS, max_length * 2)
+
+def _summarize_once(client: Groq, text: str, max_length: int) -> str:
+    """Summarize text that fits into one request"""
+    max_tokens = _summary_max_tokens(max_length)
+    budget = prompt_budget(SUMMARY_MODEL, [SUMMARY_PROMPT_TEMPLATE.format(max_length=max_length, text="")],
+                           max_tokens)
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(max_length=max_length, text=pack_text(text, budget))
+    messages = [{"role": "user", "content": prompt}]
+    return _chat_completion(client, messages, SUMMARY_MODEL, temperature=0.3,
+                            max_tokens=max_tokens, label="Summary generation").strip()
+
+def _summarize_chunks(client: Groq, chunks: List[str], max_workers: int, source: str) -> List[str]:
+    """
+    Summarize chunks in parallel, each to SUMMARY_CHUNK_WORDS words
+    
+    The prompts do not depend on the requested summary length, so the
+    response cache serves these for any max_length.
+    """
+    def run(index: int) -> str:
+        prompt = CHUNK_SUMMARY_PROMPT_TEMPLATE.format(
+            part=index + 1, total=len(chunks), source=source, max_length=SUMMARY_CHUNK_WORDS, text=chunks[index]
         )
-        
-        keywords_str = chat_completion.choices[0].message.content.strip()
-        keywords = [k.strip() for k in keywords_str.split(',') if k.strip()]
-        
-        return keywords[:max_keywords]
-        
-    except Exception as e:
-        print(f"Error extracting keywords: {str(e)}")
-        return []
+        messages = [{"role": "user", "content": prompt}]
+        return _chat_completion(client, messages, SUMMARY_MODEL, temperature=0.3,
+                                max_tokens=SUMMARY_CHUNK_MAX_TOKENS,
+                                label=f"Chunk {index + 1} summary").strip()
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        return list(executor.map(run, range(len(chunks))))
 
-def summarize_text(text: str, max_length: int = 200) -> str:
+def summarize_text(text: str, max_length: int = 200, hierarchical: bool = True,
+                   max_workers: int = NOTES_MAX_WORKERS) -> str:
     """
     Create a concise summary of text
     
+    Text longer than SUMMARY_CHUNK_TOKENS is split into fixed-size chunks
+    on sentence boundaries, the chunks are summarized in parallel, and the
+    summaries are summarized again (in groups, as often as needed) until
+    one request produces the final summary of max_length words.
+    
     Args:
         text: Input text
         max_length: Maximum words in summary
+        hierarchical: Summarize long text in chunks instead of truncating it
+        max_workers: Maximum number of concurrent requests
         
     Returns:
         Summary text
     """
     try:
         api_key = get_api_key("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
+        client = get_groq_client(api_key)
         
-        # Truncate if too long
-        if len(text) > 15000:
-            text = text[:15000]
+        if hierarchical:
+            chunk_budget = min(SUMMARY_CHUNK_TOKENS, prompt_budget(
+                SUMMARY_MODEL,
+                [CHUNK_SUMMARY_PROMPT_TEMPLATE.format(part=0, total=0, source="", max_length=0, text="")],
+                SUMMARY_CHUNK_MAX_TOKENS
+            ))
+            source = "a longer text"
+            while count_tokens(text) > chunk_budget:
+                summaries = _summarize_chunks(client, chunk_by_tokens(text, chunk_budget), max_workers, source)
+                text = "\n\n".join(summaries)
+                source = "a sequence of partial summaries of a longer text"
+                if len(summaries) == 1:
+                    break
         
-        prompt = f"""Create a concise summary (maximum {max_length} words) of the following text. 
-Focus on the main points and key information.
-
-Text:
-{text}"""
-
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=500,
-        )
+        summary = _summarize_once(client, text, max_length)
         
-        summary = chat_completion.choices[0].message.content.strip()
+        # One more pass if the model overshot the requested length
+        if len(summary.split()) > max_length * 1.2:
+            summary = _summarize_once(client, summary, max_length)
         return summary
         
     except Exception as e:
@@ -2,8 +2,12 @@ import streamlit as st
 import os
 from pathlib import Path
 import tempfile
-from api_models import transcribe_audio, generate_notes, extract_keywords
+from api_models import stream_notes, extract_keywords, STREAM_RESTART
 from formatter import format_notes, extract_sections
+from keyword_utils import record_document
+from pipeline import run_concurrent_stages
+from transcription_jobs import get_job_manager
+from metrics import span
 import traceback
 import time
 import base64
@@ -245,7 +249,8 @@ def initialize_session_state():
         'keywords': [],
         'processing': False,
         'recorded_audio': None,
-        'show_recorder_actions': False
+        'show_recorder_actions': False,
+        'transcription_job': None
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -269,43 +274,130 @@ def validate_api_keys():
     
     return missing_keys
 
-def process_audio_file(file_path, file_type="uploaded"):
-    """Process audio file and generate notes"""
+JOB_STATUS_MESSAGES = {
+    'preparing': "📤 Preparing and uploading audio...",
+    'queued': "⏳ Waiting for the transcription service...",
+    'processing': "🎙️ Transcribing audio... This may take a few minutes.",
+}
+
+def start_transcription(file_path):
+    """Submit an audio file for transcription without waiting for it"""
+    job_id = get_job_manager().submit(file_path, delete_audio=True)
+    st.session_state.transcription_job = job_id
+    st.session_state.transcript = None
+    st.session_state.notes = None
+    st.session_state.keywords = []
+    # Keeps the job attached to the page across reloads
+    st.query_params['job'] = job_id
+
+def forget_transcription_job():
+    st.session_state.transcription_job = None
+    if 'job' in st.query_params:
+        del st.query_params['job']
+
+def watch_transcription_job(job_id, refresh_interval=1.0):
+    """
+    Show the progress of a transcription job and continue once it is done
+    
+    The job runs in the background job manager, so this only reads its
+    state; while it is running the script sleeps briefly and reruns.
+    
+    Returns:
+        True if notes were generated from the finished transcript
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        forget_transcription_job()
+        st.warning("⚠️ This transcription is no longer available. Please upload the audio again.")
+        return False
+    
+    st.session_state.transcription_job = job_id
+    
+    if not job.done:
+        state = job.to_dict()
+        progress = 5 if state['status'] == 'preparing' else 20
+        if state['status'] == 'processing':
+            progress += 40 * state['segments_done'] // state['segments']
+        st.progress(progress)
+        st.info(JOB_STATUS_MESSAGES[state['status']])
+        time.sleep(refresh_interval)
+        st.rerun()
+    
+    forget_transcription_job()
+    if job.status == 'error':
+        st.error(f"❌ Error: {job.error}")
+        return False
+    return process_transcript(job.text)
+
+def process_transcript(transcript):
+    """Generate keywords and notes from a finished transcript"""
     try:
-        progress_bar = st.progress(0)
+        progress_bar = st.progress(60)
         status_text = st.empty()
         
-        # Transcription
-        status_text.info("🎙️ Transcribing audio... This may take a few minutes.")
-        progress_bar.progress(20)
-        
-        transcript = transcribe_audio(file_path)
-        
         if not transcript or len(transcript.strip()) < 50:
             st.error("⚠️ Transcription failed or returned insufficient content.")
             return False
         
         st.session_state.transcript = transcript
-        progress_bar.progress(60)
         
-        # Extract keywords
-        status_text.info("🔍 Extracting key concepts...")
-        progress_bar.progress(70)
-        keywords = extract_keywords(transcript, max_keywords=10)
-        st.session_state.keywords = keywords
+        # Keyword extraction and note generation only need the transcript, so run them together
+        stage_labels = {
+            'keywords': "🔍 Extracting key concepts",
+            'notes': "🤖 Analyzing lecture structure",
+        }
+        pending = list(stage_labels)
+        status_text.info(" · ".join(stage_labels[name] for name in pending) + "... Please wait.")
         
-        # Generate notes
-        status_text.info("🤖 Analyzing lecture structure... Please wait.")
-        progress_bar.progress(80)
+        def on_stage_complete(name, result, error):
+            pending.remove(name)
+            if name == 'keywords' and keyword_errors:
+                st.warning(f"⚠️ Keyword extraction failed, continuing without keywords: {keyword_errors[0]}")
+            progress_bar.progress(60 + 40 * (len(stage_labels) - len(pending)) // len(stage_labels))
+            if pending:
+                status_text.info(" · ".join(stage_labels[name] for name in pending) + "... Please wait.")
         
-        notes = generate_notes(transcript)
+        # Keywords are optional: a failure is shown as a warning and the notes are kept
+        keyword_errors = []
+        
+        # Notes stream onto the page, so that stage stays on the script thread
+        def keywords_stage():
+            try:
+                with span('keywords', characters=len(transcript)) as stage:
+                    keywords = extract_keywords(transcript, max_keywords=10)
+                    stage['keywords'] = len(keywords)
+                    # Count the lecture in the corpus statistics used for TF-IDF/BM25 ranking
+                    record_document(transcript)
+                    return keywords
+            except Exception as e:
+                keyword_errors.append(str(e))
+                return []
+        
+        def notes_stage(report_finished):
+            def chunks():
+                # Show finished background stages between stream chunks
+                for chunk in stream_notes(transcript):
+                    report_finished()
+                    yield chunk
+            
+            with span('notes', characters=len(transcript)) as stage:
+                notes = display_notes(notes_stream=chunks())
+                stage['notes_characters'] = len(notes or '')
+                return notes
+        
+        results = run_concurrent_stages({
+            'keywords': keywords_stage,
+            'notes': notes_stage,
+        }, on_stage_complete=on_stage_complete, foreground_stage='notes')
+        
+        st.session_state.keywords = results['keywords']
+        notes = results['notes']
         
         if not notes:
             st.error("⚠️ Note generation failed. Please try again.")
             return False
         
         st.session_state.notes = notes
-        progress_bar.progress(100)
         
         time.sleep(0.5)
         progress_bar.empty()
@@ -320,8 +412,48 @@ def process_audio_file(file_path, file_type="uploaded"):
             st.code(traceback.format_exc())
         return False
 
-def display_notes():
-    """Display generated notes"""
+def render_notes_stream(notes_stream, refresh_interval=0.15):
+    """
+    Render notes progressively while they are being generated
+    
+    Args:
+        notes_stream: Iterator of text chunks from api_models.stream_notes
+        refresh_interval: Minimum seconds between redraws
+        
+    Returns:
+        The complete notes text
+    """
+    st.markdown('<div class="section-header">📖 Your Notes</div>', unsafe_allow_html=True)
+    placeholder = st.empty()
+    
+    parts = []
+    last_render = 0.0
+    for chunk in notes_stream:
+        if chunk is STREAM_RESTART:
+            parts = []
+            placeholder.info("🔄 Retrying note generation...")
+            continue
+        
+        parts.append(chunk)
+        now = time.monotonic()
+        if now - last_render >= refresh_interval:
+            placeholder.markdown(''.join(parts) + " ▌")
+            last_render = now
+    
+    notes = ''.join(parts)
+    placeholder.markdown(notes)
+    return notes
+
+def display_notes(notes_stream=None):
+    """
+    Display generated notes
+    
+    When notes_stream is given, the notes are rendered progressively as
+    chunks arrive and the complete text is returned.
+    """
+    if notes_stream is not None:
+        return render_notes_stream(notes_stream)
+    
     if not st.session_state.notes:
         return
     
@@ -332,7 +464,8 @@ def display_notes():
     with col_main:
         st.markdown('<div class="notes-container">', unsafe_allow_html=True)
         
-        sections = extract_sections(st.session_state.notes)
+        with span('formatting', characters=len(st.session_state.notes)):
+            sections = extract_sections(st.session_state.notes)
         
         for section_title, section_content in sections.items():
             if section_title.lower() == "introduction":
@@ -425,6 +558,12 @@ GROQ_API_KEY = "your_key"
             """)
         return
     
+    # Reattach to a transcription started before this rerun or page reload
+    job_id = st.session_state.transcription_job or st.query_params.get('job')
+    if job_id:
+        if watch_transcription_job(job_id):
+            st.rerun()
+    
     # Main tabs - Only Upload and Live Recording
     tab1, tab2 = st.tabs(["📁 Upload Audio", "🎙️ Live Recording"])
     
@@ -445,13 +584,9 @@ GROQ_API_KEY = "your_key"
                     tmp.write(uploaded_file.getvalue())
                     tmp_path = tmp.name
                 
-                try:
-                    success = process_audio_file(tmp_path)
-                    if success:
-                        st.rerun()
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
+                # The job manager deletes the temp file once it is uploaded
+                start_transcription(tmp_path)
+                st.rerun()
     
     with tab2:
         st.markdown("### Record your lecture live")
@@ -481,13 +616,8 @@ GROQ_API_KEY = "your_key"
                         tmp.write(audio_bytes.getvalue())
                         tmp_path = tmp.name
                     
-                    try:
-                        success = process_audio_file(tmp_path, "recorded")
-                        if success:
-                            st.rerun()
-                    finally:
-                        if os.path.exists(tmp_path):
-                            os.unlink(tmp_path)
+                    start_transcription(tmp_path)
+                    st.rerun()
             
             with col2:
                 st.download_button(
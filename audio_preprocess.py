@@ -0,0 +1,315 @@
+"""
+Audio preprocessing before upload
+Uses ffmpeg to downmix recordings to mono, resample them to 16 kHz, trim
+leading and trailing silence and encode them to low-bitrate Opus (or
+FLAC), so a 300 MB WAV uploads as a few megabytes. Speech recognition
+only needs 16 kHz mono, so transcripts are unaffected.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from typing import Optional, List, Tuple, Dict, Any
+
+from metrics import span
+
+TARGET_SAMPLE_RATE = 16000
+OPUS_BITRATE = "24k"  # Plenty for 16 kHz mono speech
+SILENCE_THRESHOLD_DB = -50
+MIN_EDGE_SILENCE_SECONDS = 0.5  # Shorter leading/trailing pauses are kept
+DEFAULT_UPLOAD_MBPS = 10.0  # Used to estimate upload time saved
+
+# Splitting long recordings for parallel transcription
+SEGMENT_MAX_SECONDS = 600.0
+SEGMENT_OVERLAP_SECONDS = 1.0
+SPLIT_SILENCE_THRESHOLD_DB = -35  # Pauses in speech, not digital silence
+SPLIT_MIN_SILENCE_SECONDS = 0.3
+
+CODECS = {
+    'opus': {'suffix': '.ogg', 'args': ['-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip']},
+    'flac': {'suffix': '.flac', 'args': ['-c:a', 'flac', '-sample_fmt', 's16']},
+}
+
+_DURATION = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+_SILENCE_START = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+_SILENCE_END = re.compile(r'silence_end: (\d+(?:\.\d+)?)')
+
+def find_ffmpeg() -> Optional[str]:
+    """
+    Locate the ffmpeg binary
+
+    LECTUREAI_FFMPEG may point at a specific binary; otherwise ffmpeg is
+    looked up on PATH (packages.txt installs it on Streamlit Cloud).
+
+    Returns:
+        Path to ffmpeg, or None if it is not installed
+    """
+    configured = os.getenv("LECTUREAI_FFMPEG")
+    if configured:
+        return configured if os.path.exists(configured) else shutil.which(configured)
+    return shutil.which("ffmpeg")
+
+def upload_seconds(num_bytes: int, mbps: Optional[float] = None) -> float:
+    """
+    Estimate how long uploading a number of bytes takes
+
+    Args:
+        num_bytes: Upload size
+        mbps: Upload bandwidth in megabits per second (LECTUREAI_UPLOAD_MBPS by default)
+
+    Returns:
+        Estimated seconds
+    """
+    if mbps is None:
+        mbps = float(os.getenv("LECTUREAI_UPLOAD_MBPS", DEFAULT_UPLOAD_MBPS))
+    return num_bytes * 8 / (mbps * 1_000_000)
+
+def detect_silences(
+    audio_path: str,
+    threshold_db: float = SILENCE_THRESHOLD_DB,
+    min_silence: float = MIN_EDGE_SILENCE_SECONDS,
+    ffmpeg: Optional[str] = None
+) -> Tuple[List[Tuple[float, float]], Optional[float]]:
+    """
+    Find silent stretches with ffmpeg's silencedetect filter
+
+    Args:
+        audio_path: Recording to analyse
+        threshold_db: Volume below which audio counts as silence
+        min_silence: Minimum length of a reported silence in seconds
+        ffmpeg: ffmpeg binary (found automatically if None)
+
+    Returns:
+        Tuple of (silences as (start, end) seconds, duration in seconds or None if unknown)
+    """
+    ffmpeg = ffmpeg or find_ffmpeg()
+    if not ffmpeg:
+        raise FileNotFoundError("ffmpeg is not installed")
+
+    result = subprocess.run(
+        [ffmpeg, '-hide_banner', '-nostats', '-i', audio_path, '-vn',
+         '-af', f'silencedetect=noise={threshold_db}dB:d={min_silence}', '-f', 'null', '-'],
+        capture_output=True, text=True, errors='replace'
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not read the audio: {result.stderr.strip()[-300:]}")
+
+    duration = None
+    match = _DURATION.search(result.stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        match = _SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if start is not None and duration is not None:
+        # Silence running to the end of the file has no silence_end line
+        silences.append((start, duration))
+
+    return silences, duration
+
+def _speech_bounds(silences: List[Tuple[float, float]], duration: Optional[float]) -> Tuple[float, Optional[float]]:
+    """Start and end of the audio once leading and trailing silence are removed"""
+    start, end = 0.0, duration
+    if silences and silences[0][0] <= 0.05:
+        start = silences[0][1]
+    if duration is not None and silences and silences[-1][1] >= duration - 0.05 and silences[-1][0] > start:
+        end = silences[-1][0]
+    return start, end
+
+def preprocess_audio(
+    audio_path: str,
+    codec: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    trim_silence: bool = True
+) -> Dict[str, Any]:
+    """
+    Shrink a recording for upload
+
+    Falls back to the original file when ffmpeg is missing, fails, or
+    would not make the file smaller.
+
+    Args:
+        audio_path: Recording to preprocess
+        codec: 'opus', 'flac' or 'off' (LECTUREAI_PREPROCESS_CODEC, default opus)
+        output_dir: Directory for the processed file (temp dir if None)
+        trim_silence: Remove leading and trailing silence
+
+    Returns:
+        Dictionary with path (file to upload), processed (False if the
+        original is used), original_bytes, processed_bytes, bytes_saved,
+        upload_seconds_saved and offset_seconds (audio trimmed from the
+        start; add it to timestamps in the transcript)
+    """
+    with span('preprocess') as stage:
+        result = _preprocess_audio(audio_path, codec, output_dir, trim_silence)
+        stage.update(bytes=result['original_bytes'], bytes_out=result['processed_bytes'],
+                     bytes_saved=result['bytes_saved'], processed=result['processed'])
+    return result
+
+def _preprocess_audio(audio_path: str, codec: Optional[str], output_dir: Optional[str],
+                      trim_silence: bool) -> Dict[str, Any]:
+    original_bytes = os.path.getsize(audio_path)
+    result = {
+        'path': audio_path,
+        'processed': False,
+        'original_bytes': original_bytes,
+        'processed_bytes': original_bytes,
+        'bytes_saved': 0,
+        'upload_seconds_saved': 0.0,
+        'offset_seconds': 0.0,
+    }
+
+    codec = (codec or os.getenv("LECTUREAI_PREPROCESS_CODEC", "opus")).lower()
+    if codec == 'off':
+        return result
+
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        print("ffmpeg not found; uploading the original audio")
+        return result
+
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported codec '{codec}', expected one of {', '.join(CODECS)}")
+
+    fd, output_path = tempfile.mkstemp(prefix="lectureai_", suffix=CODECS[codec]['suffix'], dir=output_dir)
+    os.close(fd)
+
+    try:
+        trim_args = []
+        offset = 0.0
+        if trim_silence:
+            start, end = _speech_bounds(*detect_silences(audio_path, ffmpeg=ffmpeg))
+            if start > 0:
+                trim_args += ['-ss', f'{start:.3f}']
+                offset = start
+            if end is not None:
+                trim_args += ['-to', f'{end:.3f}']
+
+        command = ([ffmpeg, '-hide_banner', '-nostats', '-y', '-i', audio_path] + trim_args +
+                   ['-vn', '-ac', '1', '-ar', str(TARGET_SAMPLE_RATE)] + CODECS[codec]['args'] + [output_path])
+        completed = subprocess.run(command, capture_output=True, text=True, errors='replace')
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip()[-300:])
+
+        processed_bytes = os.path.getsize(output_path)
+        if processed_bytes == 0 or processed_bytes >= original_bytes:
+            os.unlink(output_path)
+            return result
+
+    except Exception as e:
+        print(f"Audio preprocessing failed, uploading the original: {str(e)}")
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        return result
+
+    bytes_saved = original_bytes - processed_bytes
+    result.update({
+        'path': output_path,
+        'processed': True,
+        'processed_bytes': processed_bytes,
+        'bytes_saved': bytes_saved,
+        'upload_seconds_saved': upload_seconds(bytes_saved),
+        'offset_seconds': offset,
+    })
+    return result
+
+def format_savings(result: Dict[str, Any]) -> str:
+    """One-line report of what preprocessing saved"""
+    if not result['processed']:
+        return f"Uploading original audio ({result['original_bytes'] / 1_000_000:.1f} MB)"
+    percent = result['bytes_saved'] / result['original_bytes'] * 100
+    return (f"Preprocessed audio: {result['original_bytes'] / 1_000_000:.1f} MB -> "
+            f"{result['processed_bytes'] / 1_000_000:.1f} MB ({percent:.0f}% smaller, "
+            f"~{result['upload_seconds_saved']:.1f}s less upload)")
+
+def plan_segments(
+    silences: List[Tuple[float, float]],
+    duration: float,
+    max_seconds: float = SEGMENT_MAX_SECONDS,
+    overlap_seconds: float = SEGMENT_OVERLAP_SECONDS
+) -> List[Dict[str, float]]:
+    """
+    Choose where to cut a long recording
+
+    Each cut is placed in the middle of the longest silence in the second
+    half of the allowed segment length, so words are not split; if there is
+    no silence the cut is forced at max_seconds. Segments are read with
+    some overlap on both sides, and cut_start/cut_end tell which part of a
+    segment's transcript to keep.
+
+    Args:
+        silences: Silent stretches as (start, end) seconds
+        duration: Length of the recording in seconds
+        max_seconds: Maximum segment length, not counting overlap
+        overlap_seconds: Extra audio read on each side of a cut
+
+    Returns:
+        List of segments with start, end, cut_start and cut_end in seconds
+    """
+    cuts = [0.0]
+    while duration - cuts[-1] > max_seconds:
+        window_start = cuts[-1] + max_seconds / 2
+        window_end = cuts[-1] + max_seconds
+        candidates = [(end - start, (start + end) / 2) for start, end in silences
+                      if window_start <= (start + end) / 2 <= window_end]
+        cuts.append(max(candidates)[1] if candidates else window_end)
+    cuts.append(duration)
+
+    return [
+        {
+            'start': max(0.0, cut_start - overlap_seconds),
+            'end': min(duration, cut_end + overlap_seconds),
+            'cut_start': cut_start,
+            'cut_end': cut_end,
+        }
+        for cut_start, cut_end in zip(cuts, cuts[1:])
+    ]
+
+def split_audio(audio_path: str, segments: List[Dict[str, float]], output_dir: Optional[str] = None) -> List[str]:
+    """
+    Write each planned segment to its own mono 16 kHz Opus file
+
+    Args:
+        audio_path: Recording to split
+        segments: Segments from plan_segments
+        output_dir: Directory for the segment files (temp dir if None)
+
+    Returns:
+        Paths of the segment files, in order; the caller deletes them
+    """
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        raise FileNotFoundError("ffmpeg is not installed")
+
+    paths = []
+    try:
+        # One ffmpeg run writes every segment, so the recording is decoded only once
+        command = [ffmpeg, '-hide_banner', '-nostats', '-y', '-i', audio_path]
+        for segment in segments:
+            fd, path = tempfile.mkstemp(prefix="lectureai_segment_", suffix=CODECS['opus']['suffix'], dir=output_dir)
+            os.close(fd)
+            paths.append(path)
+            command += (['-ss', f"{segment['start']:.3f}", '-to', f"{segment['end']:.3f}",
+                         '-vn', '-ac', '1', '-ar', str(TARGET_SAMPLE_RATE)] + CODECS['opus']['args'] + [path])
+        completed = subprocess.run(command, capture_output=True, text=True, errors='replace')
+        if completed.returncode != 0:
+            raise RuntimeError(f"ffmpeg could not split the audio: {completed.stderr.strip()[-300:]}")
+    except Exception:
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        raise
+
+    return paths
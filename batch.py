@@ -0,0 +1,256 @@
+"""
+Headless batch processing
+Turns a directory (or manifest) of lecture recordings into transcripts,
+keywords and notes with a worker pool. Outputs are written next to each
+input, and a checkpoint file lets an interrupted run resume without
+redoing finished stages.
+
+Usage:
+    python batch.py lectures/ --workers 4
+    python batch.py manifest.txt --checkpoint run.checkpoint.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from api_models import transcribe_audio, generate_notes, extract_keywords
+from keyword_utils import record_document
+from pipeline import run_concurrent_stages
+from metrics import span
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.mp4', '.flac', '.ogg'}
+STAGES = ['transcript', 'keywords', 'notes']
+CHECKPOINT_NAME = '.lectureai_checkpoint.json'
+
+def output_paths(audio_path: str) -> Dict[str, str]:
+    """
+    Output files written next to an input recording
+
+    Args:
+        audio_path: Path to the recording
+
+    Returns:
+        Dictionary with stage names as keys and output paths as values
+    """
+    stem = os.path.splitext(audio_path)[0]
+    return {
+        'transcript': f"{stem}.transcript.txt",
+        'keywords': f"{stem}.keywords.json",
+        'notes': f"{stem}.notes.md",
+    }
+
+def collect_inputs(source: str) -> List[str]:
+    """
+    Resolve a directory or manifest into a list of recordings
+
+    A manifest is either a text file with one path per line (blank lines
+    and lines starting with # are ignored) or a JSON list of paths.
+    Relative paths are resolved against the manifest's directory.
+
+    Args:
+        source: Directory or manifest file
+
+    Returns:
+        Sorted list of absolute paths
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    paths.append(os.path.join(root, name))
+        return sorted(os.path.abspath(p) for p in paths)
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if source.lower().endswith('.json'):
+        entries = json.loads(content)
+    else:
+        entries = [line.strip() for line in content.splitlines()
+                   if line.strip() and not line.strip().startswith('#')]
+
+    return sorted(os.path.abspath(os.path.join(base_dir, entry)) for entry in entries)
+
+class Checkpoint:
+    """
+    Record of finished stages per input, saved after every stage
+
+    An input's entry is discarded when the recording changes (size or
+    modification time), so edited files are processed again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {'files': {}}
+
+    @staticmethod
+    def _fingerprint(audio_path: str) -> str:
+        stat = os.stat(audio_path)
+        return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+    def done_stages(self, audio_path: str) -> List[str]:
+        """Stages already finished for an unchanged recording"""
+        with self._lock:
+            entry = self.data['files'].get(audio_path)
+            if not entry or entry.get('fingerprint') != self._fingerprint(audio_path):
+                return []
+            return list(entry.get('stages', []))
+
+    def mark_done(self, audio_path: str, stage: str) -> None:
+        """Record a finished stage and persist the checkpoint"""
+        with self._lock:
+            fingerprint = self._fingerprint(audio_path)
+            entry = self.data['files'].get(audio_path)
+            if not entry or entry.get('fingerprint') != fingerprint:
+                entry = {'fingerprint': fingerprint, 'stages': []}
+                self.data['files'][audio_path] = entry
+            if stage not in entry['stages']:
+                entry['stages'].append(stage)
+            entry['updated'] = time.time()
+            self._save()
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def _write_text(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def process_file(audio_path: str, checkpoint: Checkpoint, max_keywords: int = 10) -> List[str]:
+    """
+    Run the missing pipeline stages for one recording
+
+    Args:
+        audio_path: Path to the recording
+        checkpoint: Shared checkpoint
+        max_keywords: Number of keywords to extract
+
+    Returns:
+        Stages that were run (empty if everything was already done)
+    """
+    outputs = output_paths(audio_path)
+    done = {stage for stage in checkpoint.done_stages(audio_path) if os.path.exists(outputs[stage])}
+    ran = []
+
+    if 'transcript' in done:
+        with open(outputs['transcript'], 'r', encoding='utf-8') as f:
+            transcript = f.read()
+    else:
+        transcript = transcribe_audio(audio_path)
+        if not transcript or len(transcript.strip()) < 50:
+            raise Exception("Transcription failed or returned insufficient content")
+        _write_text(outputs['transcript'], transcript)
+        checkpoint.mark_done(audio_path, 'transcript')
+        ran.append('transcript')
+
+    def write_keywords():
+        with span('keywords', characters=len(transcript)) as stage:
+            keywords = extract_keywords(transcript, max_keywords=max_keywords)
+            stage['keywords'] = len(keywords)
+            record_document(transcript)
+        _write_text(outputs['keywords'], json.dumps(keywords, indent=2))
+        return keywords
+
+    def write_notes():
+        with span('notes', characters=len(transcript)) as stage:
+            notes = generate_notes(transcript)
+            if not notes:
+                raise Exception("Note generation failed")
+            stage['notes_characters'] = len(notes)
+        _write_text(outputs['notes'], notes)
+        return notes
+
+    # Keywords and notes only need the transcript, so they run side by side
+    stages = {}
+    if 'keywords' not in done:
+        stages['keywords'] = write_keywords
+    if 'notes' not in done:
+        stages['notes'] = write_notes
+
+    def on_stage_complete(stage, result, error):
+        if error is None:
+            checkpoint.mark_done(audio_path, stage)
+            ran.append(stage)
+
+    run_concurrent_stages(stages, on_stage_complete=on_stage_complete)
+    return ran
+
+def run_batch(inputs: List[str], checkpoint_path: str, workers: int = 4, max_keywords: int = 10) -> Dict[str, int]:
+    """
+    Process many recordings with a worker pool
+
+    Args:
+        inputs: Recordings to process
+        checkpoint_path: Checkpoint file to resume from and update
+        workers: Number of recordings processed at the same time
+        max_keywords: Number of keywords to extract per recording
+
+    Returns:
+        Counts of processed, skipped and failed recordings
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    counts = {'processed': 0, 'skipped': 0, 'failed': 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(process_file, path, checkpoint, max_keywords): path for path in inputs}
+        for number, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                ran = future.result()
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"[{number}/{len(inputs)}] FAILED {path}: {str(e)}")
+                continue
+            if ran:
+                counts['processed'] += 1
+                print(f"[{number}/{len(inputs)}] done {path} ({', '.join(ran)})")
+            else:
+                counts['skipped'] += 1
+                print(f"[{number}/{len(inputs)}] skipped {path} (already complete)")
+
+    return counts
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate transcripts, keywords and notes for many lectures")
+    parser.add_argument('source', help="Directory of recordings, or a manifest (.txt with one path per line, or .json list)")
+    parser.add_argument('--workers', type=int, default=4, help="Recordings processed at the same time")
+    parser.add_argument('--checkpoint', help=f"Checkpoint file (default: {CHECKPOINT_NAME} next to the source)")
+    parser.add_argument('--max-keywords', type=int, default=10, help="Keywords extracted per recording")
+    parser.add_argument('--restart', action='store_true', help="Ignore the existing checkpoint and redo every stage")
+    args = parser.parse_args(argv)
+
+    source_dir = args.source if os.path.isdir(args.source) else os.path.dirname(os.path.abspath(args.source))
+    checkpoint_path = args.checkpoint or os.path.join(source_dir, CHECKPOINT_NAME)
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    inputs = collect_inputs(args.source)
+    if not inputs:
+        print("No recordings found")
+        return 1
+
+    print(f"Processing {len(inputs)} recordings with {args.workers} workers")
+    counts = run_batch(inputs, checkpoint_path, args.workers, args.max_keywords)
+    print(f"Finished: {counts['processed']} processed, {counts['skipped']} skipped, {counts['failed']} failed")
+    return 1 if counts['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+End-to-end pipeline benchmark
+Runs transcribe_audio -> extract_keywords -> generate_notes for N concurrent
+sessions against the local mock servers and reports per-stage latency
+percentiles and throughput
+
+Usage:
+    python benchmark.py --sessions 50 --concurrency 10 --latency-ms 80
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import assemblyai as aai
+
+from mock_servers import MockProfile, start_mock_groq, start_mock_assemblyai
+
+STAGES = ['transcribe', 'keywords', 'notes', 'total']
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile
+
+    Args:
+        values: Samples
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value (0.0 for no samples)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def _run_session(index: int, audio_dir: str) -> Dict[str, float]:
+    """Run the whole pipeline once and time each stage"""
+    from api_models import transcribe_audio, extract_keywords, generate_notes
+
+    # Unique audio bytes per session, so nothing can be served from a cache
+    audio_path = os.path.join(audio_dir, f"session_{index}.wav")
+    with open(audio_path, 'wb') as f:
+        f.write(os.urandom(64 * 1024))
+
+    timings = {}
+    start = time.perf_counter()
+
+    stage_start = time.perf_counter()
+    transcript = transcribe_audio(audio_path, use_cache=False, preprocess=False)
+    timings['transcribe'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    extract_keywords(transcript, max_keywords=10)
+    timings['keywords'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    generate_notes(transcript)
+    timings['notes'] = time.perf_counter() - stage_start
+
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+def run_benchmark(sessions: int, concurrency: int, profile: MockProfile,
+                  response_cache: bool = False) -> Dict[str, object]:
+    """
+    Benchmark the pipeline against freshly started mock servers
+
+    Args:
+        sessions: Total number of pipeline runs
+        concurrency: Number of sessions running at the same time
+        profile: Behaviour of both mock servers
+        response_cache: Serve repeated Groq requests from a fresh in-memory response cache
+
+    Returns:
+        Report with per-stage p50/p95/p99 latency (seconds), throughput and failures
+    """
+    groq_server = start_mock_groq(profile)
+    aai_server = start_mock_assemblyai(profile)
+
+    os.environ['GROQ_API_KEY'] = 'mock-groq-key'
+    os.environ['ASSEMBLYAI_API_KEY'] = 'mock-assemblyai-key'
+    os.environ['GROQ_BASE_URL'] = groq_server.base_url
+    aai.settings.base_url = aai_server.base_url
+    aai.settings.polling_interval = max(0.05, min(1.0, profile.transcription_seconds / 4))
+
+    # New clients so they pick up the mock base URLs
+    from clients import configure_client_pools
+    registry = configure_client_pools(max_connections=max(20, concurrency * 2),
+                                      max_keepalive_connections=max(10, concurrency * 2))
+    
+    # The mock transcripts repeat, so a shared cache would hide most Groq calls
+    from response_cache import configure_response_cache, MemoryBackend
+    cache = configure_response_cache(MemoryBackend() if response_cache else None)
+
+    samples = {stage: [] for stage in STAGES}
+    failures = 0
+
+    try:
+        with tempfile.TemporaryDirectory() as audio_dir:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(_run_session, i, audio_dir) for i in range(sessions)]
+                for future in futures:
+                    try:
+                        timings = future.result()
+                    except Exception as e:
+                        failures += 1
+                        print(f"Session failed: {str(e)}")
+                        continue
+                    for stage, seconds in timings.items():
+                        samples[stage].append(seconds)
+            elapsed = time.perf_counter() - start
+    finally:
+        groq_server.stop()
+        aai_server.stop()
+
+    completed = len(samples['total'])
+    return {
+        'sessions': sessions,
+        'concurrency': concurrency,
+        'completed': completed,
+        'failures': failures,
+        'elapsed_seconds': elapsed,
+        'throughput_sessions_per_second': completed / elapsed if elapsed else 0.0,
+        'stages': {
+            stage: {
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+            }
+            for stage, values in samples.items()
+        },
+        'server_requests': {'groq': groq_server.counters, 'assemblyai': aai_server.counters},
+        'connections': registry.stats(),
+        'response_cache': cache.stats() if cache else None,
+    }
+
+def format_report(report: Dict[str, object]) -> str:
+    """Render a benchmark report as a plain-text table"""
+    lines = [
+        f"Sessions: {report['completed']}/{report['sessions']} completed "
+        f"({report['failures']} failed) at concurrency {report['concurrency']}",
+        f"Elapsed: {report['elapsed_seconds']:.2f}s  "
+        f"Throughput: {report['throughput_sessions_per_second']:.2f} sessions/s",
+        "",
+        f"{'stage':<12}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}",
+    ]
+    for stage, stats in report['stages'].items():
+        lines.append(f"{stage:<12}{stats['p50'] * 1000:>12.1f}{stats['p95'] * 1000:>12.1f}{stats['p99'] * 1000:>12.1f}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LectureAI pipeline against mock API servers")
+    parser.add_argument('--sessions', type=int, default=20, help="Total pipeline runs")
+    parser.add_argument('--concurrency', type=int, default=5, help="Concurrent sessions")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Base latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=20.0, help="Random extra latency per request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument('--error-status', type=int, default=503, help="HTTP status of injected failures")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help="Mock LLM throughput (0 = instant)")
+    parser.add_argument('--transcription-seconds', type=float, default=1.0, help="Mock transcription job duration")
+    parser.add_argument('--transcript-words', type=int, default=2000, help="Mock transcript length")
+    parser.add_argument('--groq-rpm', type=float, default=0, help="Groq scheduler request limit (0 = unlimited)")
+    parser.add_argument('--groq-tpm', type=float, default=0, help="Groq scheduler token limit (0 = unlimited)")
+    parser.add_argument('--assemblyai-rpm', type=float, default=0, help="AssemblyAI scheduler request limit (0 = unlimited)")
+    parser.add_argument('--response-cache', action='store_true', help="Enable the Groq response cache")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    # The mocks have no real quota, so the schedulers only limit what is asked for
+    os.environ['LECTUREAI_GROQ_RPM'] = str(args.groq_rpm)
+    os.environ['LECTUREAI_GROQ_TPM'] = str(args.groq_tpm)
+    os.environ['LECTUREAI_ASSEMBLYAI_RPM'] = str(args.assemblyai_rpm)
+
+    profile = MockProfile(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tokens_per_second=args.tokens_per_second,
+        transcription_seconds=args.transcription_seconds,
+        transcript_words=args.transcript_words,
+    )
+    report = run_benchmark(args.sessions, args.concurrency, profile, response_cache=args.response_cache)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+if __name__ == "__main__":
+    main()
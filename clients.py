@@ -0,0 +1,240 @@
+"""
+Shared API clients
+Keeps one Groq client and one AssemblyAI client per API key for the whole
+process, so every Streamlit session and rerun reuses the same keep-alive
+HTTP connection pools instead of paying TLS setup on each call
+"""
+
+import os
+import json
+import threading
+import weakref
+from typing import Optional, Dict, Any
+
+import httpx
+import assemblyai as aai
+from groq import Groq, DefaultHttpxClient
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 120.0  # Seconds an idle connection stays in the pool
+
+class ConnectionStats:
+    """
+    Counts requests and the connections they travelled over
+
+    A response hook inspects the network stream each response arrived on;
+    a stream that has been seen before means the request reused a pooled
+    connection.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self._seen = weakref.WeakSet()
+        self._seen_ids = set()
+        self._lock = threading.Lock()
+
+    def _is_new(self, stream) -> bool:
+        try:
+            if stream in self._seen:
+                return False
+            self._seen.add(stream)
+        except TypeError:
+            # Stream type without weakref support; fall back to identity
+            if id(stream) in self._seen_ids:
+                return False
+            self._seen_ids.add(id(stream))
+        return True
+
+    def record(self, response: httpx.Response) -> None:
+        """Response event hook"""
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.requests += 1
+            if stream is None or self._is_new(stream):
+                self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report connection reuse
+
+        Returns:
+            Dictionary with requests, new_connections, reused_connections and reuse_rate
+        """
+        with self._lock:
+            reused = self.requests - self.new_connections
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': reused,
+                'reuse_rate': reused / self.requests if self.requests else 0.0,
+            }
+
+class ClientRegistry:
+    """
+    Thread-safe registry of pooled API clients
+
+    Groq and AssemblyAI clients are created once per API key and shared
+    across threads; both SDKs are built on httpx.Client, which is safe to
+    use concurrently.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self._groq_clients: Dict[str, Groq] = {}
+        self._aai_clients: Dict[str, aai.Client] = {}
+        self._transcribers: Dict[tuple, aai.Transcriber] = {}
+        self._stats = {'groq': ConnectionStats(), 'assemblyai': ConnectionStats()}
+        self._lock = threading.Lock()
+
+    def groq(self, api_key: str) -> Groq:
+        """
+        Return the shared Groq client for an API key
+
+        Args:
+            api_key: Groq API key
+
+        Returns:
+            Groq client backed by a keep-alive connection pool
+        """
+        with self._lock:
+            client = self._groq_clients.get(api_key)
+            if client is None:
+                http_client = DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_expiry,
+                    ),
+                    event_hooks={'response': [self._stats['groq'].record]},
+                )
+                # Retries are handled by rate_limiter's scheduler, not the SDK
+                client = Groq(api_key=api_key, http_client=http_client, max_retries=0)
+                self._groq_clients[api_key] = client
+            return client
+
+    def assemblyai(self, api_key: str) -> aai.Client:
+        """
+        Return the shared AssemblyAI client for an API key
+
+        Args:
+            api_key: AssemblyAI API key
+
+        Returns:
+            Client whose HTTP connections stay alive between calls
+        """
+        with self._lock:
+            return self._assemblyai_client(api_key)
+
+    def _assemblyai_client(self, api_key: str) -> aai.Client:
+        client = self._aai_clients.get(api_key)
+        if client is None:
+            # The AssemblyAI SDK only exposes the keep-alive expiry of its pool
+            client_settings = aai.settings.copy()
+            client_settings.api_key = api_key
+            client_settings.keepalive_expiry = self.keepalive_expiry
+            client = aai.Client(settings=client_settings)
+            client.http_client.event_hooks['response'].append(self._stats['assemblyai'].record)
+            self._aai_clients[api_key] = client
+        return client
+
+    def transcriber(self, api_key: str, settings: Dict[str, Any]) -> aai.Transcriber:
+        """
+        Return the shared AssemblyAI transcriber for an API key and config
+
+        Args:
+            api_key: AssemblyAI API key
+            settings: Keyword arguments for aai.TranscriptionConfig
+
+        Returns:
+            Transcriber whose client keeps its connections alive between calls
+        """
+        key = (api_key, json.dumps(settings, sort_keys=True, default=str))
+        with self._lock:
+            transcriber = self._transcribers.get(key)
+            if transcriber is None:
+                client = self._assemblyai_client(api_key)
+                transcriber = aai.Transcriber(client=client, config=aai.TranscriptionConfig(**settings))
+                self._transcribers[key] = transcriber
+            return transcriber
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Report connection reuse per provider
+
+        Returns:
+            Dictionary with provider names as keys and ConnectionStats snapshots as values
+        """
+        return {provider: stats.snapshot() for provider, stats in self._stats.items()}
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        with self._lock:
+            for client in self._groq_clients.values():
+                client.close()
+            for client in self._aai_clients.values():
+                client.http_client.close()
+            self._groq_clients.clear()
+            self._aai_clients.clear()
+            self._transcribers.clear()
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_client_registry() -> ClientRegistry:
+    """
+    Return the process-wide client registry
+
+    Pool sizes can be set with the LECTUREAI_POOL_MAX_CONNECTIONS,
+    LECTUREAI_POOL_MAX_KEEPALIVE and LECTUREAI_POOL_KEEPALIVE_EXPIRY
+    environment variables, or with configure_client_pools().
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry(
+                max_connections=int(os.getenv("LECTUREAI_POOL_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+                max_keepalive_connections=int(os.getenv("LECTUREAI_POOL_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+                keepalive_expiry=float(os.getenv("LECTUREAI_POOL_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY)),
+            )
+        return _registry
+
+def configure_client_pools(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY
+) -> ClientRegistry:
+    """
+    Replace the process-wide registry with one using the given pool sizes
+
+    Existing clients are closed; subsequent calls build new pooled clients.
+
+    Returns:
+        The new registry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = ClientRegistry(max_connections, max_keepalive_connections, keepalive_expiry)
+        return _registry
+
+def get_groq_client(api_key: str) -> Groq:
+    """Shortcut for get_client_registry().groq(api_key)"""
+    return get_client_registry().groq(api_key)
+
+def get_assemblyai_client(api_key: str) -> aai.Client:
+    """Shortcut for get_client_registry().assemblyai(api_key)"""
+    return get_client_registry().assemblyai(api_key)
+
+def get_transcriber(api_key: str, settings: Dict[str, Any]) -> aai.Transcriber:
+    """Shortcut for get_client_registry().transcriber(api_key, settings)"""
+    return get_client_registry().transcriber(api_key, settings)
@@ -0,0 +1,296 @@
+"""
+Persistent document-frequency store
+Counts in how many lectures each word occurs, so keyword ranking can
+discount words that are common across a whole course ("basically", the
+course name) with TF-IDF or BM25. The counts live in an open-addressing
+hash table inside a memory-mapped file: opening the store reads nothing,
+a lookup touches one or two pages, and adding a lecture only updates the
+slots of its own words.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Optional, Iterable, Dict, Any, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: only one process may update the store
+    fcntl = None
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "lectureai", "document_frequency.bin")
+MAGIC = b'LADF'
+VERSION = 1
+HEADER_SIZE = 64
+INITIAL_CAPACITY = 1 << 14  # Slots; the table doubles when it is more than MAX_LOAD full
+MAX_LOAD = 0.6
+SLOT_BYTES = 12  # 8-byte key hash + 4-byte count
+
+# Header fields after the magic: (offset, struct format)
+_FIELDS = {
+    'version': (4, '<H'),
+    'capacity': (8, '<Q'),  # Slots in the table (a power of two)
+    'documents': (16, '<Q'),
+    'used': (24, '<Q'),  # Occupied slots
+    'total_length': (32, '<Q'),  # Sum of document lengths, for BM25
+}
+
+def term_hash(term: str) -> int:
+    """64-bit hash of a term (never 0, which marks an empty slot)"""
+    value = int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+def _document_hash(document_id: str) -> int:
+    # Processed documents are remembered in the same table, in their own namespace
+    return term_hash('\x00document:' + document_id)
+
+class DocumentFrequencyStore:
+    """
+    Document frequencies of words in a memory-mapped hash table
+
+    Words are stored as 64-bit hashes only, so the file stays small and
+    collisions are negligible. Updates take a file lock, so several
+    processes (the app and a batch run) can share one store.
+
+    Args:
+        path: Store file, created if missing
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.expanduser(path or DEFAULT_PATH)
+        self._lock = threading.RLock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._hashes = None
+        self._counts = None
+        self._inode = None
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._file_lock():
+            if not os.path.exists(self.path):
+                self._write_table(self.path, INITIAL_CAPACITY, {}, documents=0, total_length=0)
+        self._open()
+
+    def _open(self) -> None:
+        self._close()
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        if self._map[:4] != MAGIC or self._header('version') != VERSION or sys.byteorder != 'little':
+            self._close()
+            raise ValueError(f"{self.path} is not a document-frequency store or has an unsupported version")
+        capacity = self._header('capacity')
+        view = memoryview(self._map)
+        self._hashes = view[HEADER_SIZE:HEADER_SIZE + 8 * capacity].cast('Q')
+        self._counts = view[HEADER_SIZE + 8 * capacity:HEADER_SIZE + SLOT_BYTES * capacity].cast('I')
+
+    def _close(self) -> None:
+        if self._hashes is not None:
+            self._hashes.release()
+            self._counts.release()
+            self._hashes = self._counts = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _header(self, name: str) -> int:
+        offset, fmt = _FIELDS[name]
+        return struct.unpack_from(fmt, self._map, offset)[0]
+
+    def _set_header(self, name: str, value: int) -> None:
+        offset, fmt = _FIELDS[name]
+        struct.pack_into(fmt, self._map, offset, value)
+
+    @staticmethod
+    def _write_table(path: str, capacity: int, entries: Dict[int, int], documents: int, total_length: int) -> None:
+        """Write a new table file atomically"""
+        hashes = array('Q', bytes(8 * capacity))
+        counts = array('I', bytes(4 * capacity))
+        mask = capacity - 1
+        for key, count in entries.items():
+            slot = key & mask
+            while hashes[slot]:
+                slot = (slot + 1) & mask
+            hashes[slot] = key
+            counts[slot] = count
+
+        header = bytearray(HEADER_SIZE)
+        header[:4] = MAGIC
+        for name, value in (('version', VERSION), ('capacity', capacity), ('documents', documents),
+                            ('used', len(entries)), ('total_length', total_length)):
+            offset, fmt = _FIELDS[name]
+            struct.pack_into(fmt, header, offset, value)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(hashes.tobytes())
+            f.write(counts.tobytes())
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive access across threads and processes"""
+        with self._lock, open(self.path + '.lock', 'a') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def refresh(self) -> None:
+        """Reopen the file if another process replaced it (after growing the table)"""
+        with self._lock:
+            try:
+                if os.stat(self.path).st_ino != self._inode:
+                    self._open()
+            except OSError:
+                pass
+
+    def _find(self, key: int) -> int:
+        """Slot holding a key, or the empty slot where it would go"""
+        hashes = self._hashes
+        mask = len(hashes) - 1
+        slot = key & mask
+        while hashes[slot] and hashes[slot] != key:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _get(self, key: int) -> int:
+        slot = self._find(key)
+        return self._counts[slot] if self._hashes[slot] else 0
+
+    @property
+    def documents(self) -> int:
+        """Number of documents added"""
+        with self._lock:
+            return self._header('documents')
+
+    @property
+    def average_length(self) -> float:
+        """Average document length in words"""
+        with self._lock:
+            documents = self._header('documents')
+            return self._header('total_length') / documents if documents else 0.0
+
+    def document_frequency(self, term: str) -> int:
+        """Number of documents containing a term"""
+        with self._lock:
+            return self._get(term_hash(term))
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency of a term (0 for an empty store)"""
+        with self._lock:
+            documents = self._header('documents')
+            df = self._get(term_hash(term))
+        return math.log(1 + (documents - df + 0.5) / (df + 0.5)) if documents else 0.0
+
+    def __contains__(self, document_id: str) -> bool:
+        """Whether a document was already added"""
+        with self._lock:
+            return bool(self._get(_document_hash(document_id)))
+
+    def add_document(self, terms: Iterable[str], length: int, document_id: Optional[str] = None) -> bool:
+        """
+        Count a document's distinct terms
+
+        Args:
+            terms: Terms of the document (duplicates are counted once)
+            length: Document length in words, for BM25
+            document_id: Stable id (e.g. a transcript hash); a document
+                with an id that was already added is skipped
+
+        Returns:
+            True if the document was added
+        """
+        keys = {term_hash(term) for term in terms}
+        with self._file_lock():
+            self.refresh()
+            if document_id is not None:
+                document_key = _document_hash(document_id)
+                if self._get(document_key):
+                    return False
+                keys.add(document_key)
+
+            used = self._header('used')
+            new_keys = [key for key in keys if not self._hashes[self._find(key)]]
+            if used + len(new_keys) > MAX_LOAD * len(self._hashes):
+                self._grow(used + len(new_keys))
+
+            for key in keys:
+                slot = self._find(key)
+                if not self._hashes[slot]:
+                    self._hashes[slot] = key
+                self._counts[slot] += 1
+            self._set_header('used', used + len(new_keys))
+            self._set_header('documents', self._header('documents') + 1)
+            self._set_header('total_length', self._header('total_length') + length)
+            self._map.flush()
+            return True
+
+    def _grow(self, needed: int) -> None:
+        """Rewrite the table with enough capacity (existing slots only, no corpus rescan)"""
+        capacity = len(self._hashes)
+        while needed > MAX_LOAD * capacity:
+            capacity *= 2
+        entries = {key: count for key, count in zip(self._hashes, self._counts) if key}
+        documents, total_length = self._header('documents'), self._header('total_length')
+        self._write_table(self.path, capacity, entries, documents, total_length)
+        self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report store size
+
+        Returns:
+            Dictionary with documents, entries (terms and document ids),
+            average_length, capacity and bytes
+        """
+        with self._lock:
+            documents = self._header('documents')
+            return {
+                'documents': documents,
+                'entries': self._header('used'),
+                'average_length': self._header('total_length') / documents if documents else 0.0,
+                'capacity': len(self._hashes),
+                'bytes': len(self._map),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+_default_store: Optional[DocumentFrequencyStore] = None
+_default_store_lock = threading.Lock()
+
+def get_document_frequency_store() -> Optional[DocumentFrequencyStore]:
+    """
+    Return the process-wide document-frequency store
+
+    LECTUREAI_DF_PATH overrides the file location; LECTUREAI_DF_PATH=off
+    disables the store (None is returned).
+    """
+    global _default_store
+    with _default_store_lock:
+        path = os.getenv("LECTUREAI_DF_PATH")
+        if path == 'off':
+            return None
+        if _default_store is None:
+            try:
+                _default_store = DocumentFrequencyStore(path)
+            except (OSError, ValueError) as e:
+                print(f"Document-frequency store unavailable: {str(e)}")
+                return None
+        else:
+            _default_store.refresh()
+        return _default_store
@@ -1,6 +1,8 @@
 import re
 from typing import List, Dict
 
+from keyword_matcher import get_matcher
+
 def format_notes(notes: str) -> str:
     """
     Format notes with improved markdown styling
@@ -98,12 +100,9 @@ def highlight_keywords(text: str, keywords: List[str]) -> str:
     Returns:
         Text with highlighted keywords
     """
-    for keyword in keywords:
-        # Use word boundaries to match whole words
-        pattern = r'\b' + re.escape(keyword) + r'\b'
-        text = re.sub(pattern, f"**{keyword}**", text, flags=re.IGNORECASE)
-    
-    return text
+    # One pass for all keywords; whole words only, and where keywords
+    # overlap the leftmost, longest one is highlighted
+    return get_matcher(keywords).replace(text, lambda keyword, matched: f"**{keyword}**")
 
 def create_summary_box(summary: str) -> str:
     """
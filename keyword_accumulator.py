@@ -0,0 +1,167 @@
+"""
+Incremental keyword statistics
+Keeps the keyword_utils counts (keywords, noun phrases, technical terms,
+numbers and statistics) up to date as a transcript arrives in pieces, so
+each new piece costs time proportional to its own length instead of a
+rerun over the whole transcript.
+"""
+
+import heapq
+import re
+from collections import Counter
+from typing import Optional, List, Dict, Hashable
+
+from text_analysis import TextAnalysis
+from keyword_utils import STOP_WORDS, NUMERIC_CATEGORIES, iter_phrase_keys
+from ngram_counter import pack_ngram, unpack_ngram
+
+DEFAULT_TOP_K = 50
+MAX_CARRY_CHARS = 2000  # Text without a sentence end is cut at a space beyond this length
+
+_LAST_SENTENCE_END = re.compile(r'.*[.!?]["\')\]]*\s', re.DOTALL)
+_LAST_SPACE = re.compile(r'.*\s', re.DOTALL)
+
+class _TopK:
+    """
+    The k highest counts among keys whose counts only grow
+
+    Because counts never decrease, a key outside the top k can only enter
+    it when its own count changes. The lowest held count is the top of a
+    min-heap; an update pushes a new entry and leaves the old one behind,
+    to be skipped when it reaches the top, so updates take O(log k)
+    amortized time.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.counts: Dict[Hashable, int] = {}
+        self._heap: List[tuple] = []  # (count, key), including outdated entries
+
+    def _floor_key(self) -> Hashable:
+        """Held key with the lowest count"""
+        heap = self._heap
+        while self.counts.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][1]
+
+    def update(self, key: Hashable, count: int) -> None:
+        counts = self.counts
+        if key not in counts and len(counts) >= self.k:
+            floor_key = self._floor_key()
+            if count <= counts[floor_key]:
+                return
+            del counts[floor_key]
+        counts[key] = count
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.k:
+            # Drop outdated entries once they far outnumber the held keys
+            self._heap = [(count, key) for key, count in counts.items()]
+            heapq.heapify(self._heap)
+
+    def most_common(self, n: Optional[int] = None) -> List[tuple]:
+        items = sorted(self.counts.items(), key=lambda item: -item[1])
+        return items if n is None else items[:n]
+
+class KeywordAccumulator:
+    """
+    Running keyword statistics over a transcript fed in deltas
+
+    Text is analysed a complete sentence at a time; the unfinished end of
+    each delta is carried over to the next one, so words (and phrases or
+    "3 million"-style findings) split between deltas are counted correctly.
+    Call finish() after the last delta to include the final sentence.
+
+    Args:
+        top_k: How many keywords, phrases and terms to keep ranked
+    """
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K):
+        self.top_k = top_k
+        self.characters = 0  # Characters analysed so far
+        self._carry = ''
+        self._vocab: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._unigrams = Counter()
+        self._phrases = Counter()
+        self._terms = Counter()
+        self._top_unigrams = _TopK(top_k)
+        self._top_phrases = _TopK(top_k)
+        self._top_terms = _TopK(top_k)
+        self._numbers: Dict[str, Dict[str, None]] = {category: {} for category in NUMERIC_CATEGORIES.values()}
+
+    def feed(self, delta: str) -> None:
+        """
+        Add the next piece of the transcript
+
+        Args:
+            delta: Text following everything fed so far (may split words)
+        """
+        pending = self._carry + delta
+        match = _LAST_SENTENCE_END.match(pending)
+        if match is None and len(pending) > MAX_CARRY_CHARS:
+            match = _LAST_SPACE.match(pending)
+        if match is None:
+            self._carry = pending
+            return
+        self._carry = pending[match.end():]
+        self._analyse(pending[:match.end()])
+
+    def finish(self) -> None:
+        """Analyse the text still carried over (end of the transcript)"""
+        if self._carry.strip():
+            self._analyse(self._carry)
+        self._carry = ''
+
+    def _global_id(self, word: str) -> int:
+        word_id = self._vocab.get(word)
+        if word_id is None:
+            word_id = self._vocab[word] = len(self._words)
+            self._words.append(word)
+        return word_id
+
+    def _analyse(self, text: str) -> None:
+        analysis = TextAnalysis(text)
+        self.characters += len(text)
+        # Token ids of this piece -> ids shared by all pieces
+        remap = [self._global_id(word) for word in analysis.vocab]
+
+        for token_id, count in analysis.counts.items():
+            word = analysis.vocab[token_id]
+            if word not in STOP_WORDS and len(word) > 3:
+                word_id = remap[token_id]
+                self._unigrams[word_id] += count
+                self._top_unigrams.update(word_id, self._unigrams[word_id])
+
+        for key, count in Counter(iter_phrase_keys(analysis)).items():
+            phrase = pack_ngram(remap[token_id] for token_id in unpack_ngram(key))
+            self._phrases[phrase] += count
+            self._top_phrases.update(phrase, self._phrases[phrase])
+
+        for kind, value, _, _ in analysis.findings:
+            if kind in ('acronym', 'capitalized'):
+                self._terms[value] += 1
+                self._top_terms.update(value, self._terms[value])
+            else:
+                self._numbers[NUMERIC_CATEGORIES[kind]][value] = None
+
+    def keywords(self, n: int = 20) -> List[str]:
+        """Most frequent words, like extract_keywords_statistical (at most top_k)"""
+        return [self._words[word_id] for word_id, _ in self._top_unigrams.most_common(n)]
+
+    def noun_phrases(self, n: int = 15) -> List[str]:
+        """Most frequent repeated phrases, like extract_noun_phrases (at most top_k)"""
+        return [' '.join(self._words[word_id] for word_id in unpack_ngram(phrase))
+                for phrase, count in self._top_phrases.most_common(n) if count > 1]
+
+    def technical_terms(self, n: Optional[int] = None) -> List[str]:
+        """Repeated acronyms and capitalized terms, most frequent first (at most top_k)"""
+        return [term for term, count in self._top_terms.most_common(n) if count > 1]
+
+    def numbers_and_stats(self) -> Dict[str, List[str]]:
+        """Numbers and statistics found so far, like extract_numbers_and_stats"""
+        return {category: list(values) for category, values in self._numbers.items()}
+
+    def counts(self, word: str) -> int:
+        """Occurrences of a (non-stop) word so far"""
+        word_id = self._vocab.get(word.lower())
+        return self._unigrams[word_id] if word_id is not None else 0
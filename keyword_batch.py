@@ -0,0 +1,188 @@
+"""
+Parallel keyword analysis
+Runs the keyword_utils functions over many transcripts in a process pool,
+so archive reprocessing uses every core instead of one thread held back by
+the GIL. Transcripts are sent to the workers in chunks, and results come
+back per transcript as soon as their chunk is finished.
+
+Usage:
+    python keyword_batch.py lectures/ --workers 8 --chunksize 16 > keywords.jsonl
+    python keyword_batch.py manifest.txt --tasks keywords phrases --output keywords.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from text_analysis import TextAnalysis
+from keyword_utils import (
+    extract_keywords_statistical, rank_keywords, extract_noun_phrases,
+    identify_technical_terms, extract_numbers_and_stats,
+)
+
+# Task name -> keyword_utils function, called with a TextAnalysis and default arguments
+KEYWORD_TASKS: Dict[str, Callable[[TextAnalysis], Any]] = {
+    'keywords': extract_keywords_statistical,
+    'ranked': rank_keywords,
+    'phrases': extract_noun_phrases,
+    'technical_terms': identify_technical_terms,
+    'numbers': extract_numbers_and_stats,
+}
+DEFAULT_CHUNKSIZE = 8  # Transcripts per task sent to a worker
+CHUNKS_IN_FLIGHT = 2  # Chunks queued per worker, so inputs are read lazily
+TRANSCRIPT_SUFFIX = '.transcript.txt'
+
+WARMUP_TEXT = ("In 2019 the MIT team trained a Neural Network on 3 million images. "
+               "The Neural Network reached 92% accuracy, and MIT published the network weights.")
+
+KeywordResult = Tuple[str, Dict[str, Any], Optional[str]]  # (key, results by task, error)
+
+_worker_tasks: List[str] = []
+
+def _init_worker(tasks: List[str]) -> None:
+    """
+    Prepare a worker process once
+
+    Running every task on a short text builds the stop-word sets, compiles
+    and caches the patterns and imports everything the tasks use, so the
+    first real transcript is not slower than the rest.
+    """
+    global _worker_tasks
+    _worker_tasks = tasks
+    analysis = TextAnalysis(WARMUP_TEXT)
+    for task in tasks:
+        KEYWORD_TASKS[task](analysis)
+
+def _analyze_chunk(items: List[Tuple[str, Optional[str]]]) -> List[KeywordResult]:
+    """Run the worker's tasks on a chunk of (key, text) pairs; a None text means key is a file to read"""
+    results = []
+    for key, text in items:
+        try:
+            if text is None:
+                with open(key, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            analysis = TextAnalysis(text)
+            results.append((key, {task: KEYWORD_TASKS[task](analysis) for task in _worker_tasks}, None))
+        except Exception as e:
+            results.append((key, {}, str(e)))
+    return results
+
+def _chunks(items: Iterable[Tuple[str, Optional[str]]], chunksize: int) -> Iterator[List[Tuple[str, Optional[str]]]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+def analyze_transcripts(
+    transcripts: Iterable[Tuple[str, Optional[str]]],
+    tasks: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[KeywordResult]:
+    """
+    Run keyword functions over many transcripts in a process pool
+
+    Every transcript is tokenized once in its worker and shared by all
+    tasks. Results are yielded in completion order, not input order, and
+    only a few chunks per worker are queued at a time, so the input may be
+    a generator over a large archive.
+
+    Args:
+        transcripts: (key, text) pairs; with text None, key is the path of
+            a transcript file for the worker to read
+        tasks: Names from KEYWORD_TASKS (all of them if None)
+        max_workers: Worker processes (defaults to the number of CPUs)
+        chunksize: Transcripts sent to a worker at a time; larger chunks
+            mean less inter-process overhead, smaller ones smoother streaming
+
+    Yields:
+        (key, results, error): results maps task names to the function
+        results; error is None, or the message if the transcript failed
+
+    Raises:
+        ValueError: If a task name is unknown or chunksize is below 1
+    """
+    tasks = list(tasks or KEYWORD_TASKS)
+    unknown = [task for task in tasks if task not in KEYWORD_TASKS]
+    if unknown:
+        raise ValueError(f"Unknown keyword tasks: {', '.join(unknown)}; expected some of {', '.join(KEYWORD_TASKS)}")
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    max_workers = max(1, max_workers or os.cpu_count() or 1)
+    chunks = _chunks(transcripts, chunksize)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(tasks,)) as executor:
+        pending = {executor.submit(_analyze_chunk, chunk)
+                   for chunk in islice(chunks, max_workers * CHUNKS_IN_FLIGHT)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Refill before handing results back, so workers stay busy while the caller consumes them
+            for chunk in islice(chunks, len(done)):
+                pending.add(executor.submit(_analyze_chunk, chunk))
+            for future in done:
+                yield from future.result()
+
+def analyze_transcript_files(paths: Iterable[str], **kwargs) -> Iterator[KeywordResult]:
+    """
+    analyze_transcripts for transcript files, read by the workers
+
+    Only the paths are sent between processes. Keys in the results are
+    the paths; keyword arguments are passed on to analyze_transcripts.
+    """
+    return analyze_transcripts(((path, None) for path in paths), **kwargs)
+
+def collect_transcripts(source: str) -> List[str]:
+    """
+    Resolve a directory (transcripts written by batch.py) or a manifest
+    with one transcript path per line into a sorted list of paths
+    """
+    if os.path.isdir(source):
+        return sorted(os.path.abspath(os.path.join(root, name))
+                      for root, _, files in os.walk(source)
+                      for name in files if name.endswith(TRANSCRIPT_SUFFIX))
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        entries = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    return sorted(os.path.abspath(os.path.join(base_dir, entry)) for entry in entries)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run keyword analysis over many transcripts on all cores")
+    parser.add_argument('source', help=f"Directory searched for *{TRANSCRIPT_SUFFIX}, or a manifest with one transcript path per line")
+    parser.add_argument('--tasks', nargs='+', choices=list(KEYWORD_TASKS), help="Analyses to run (default: all)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: number of CPUs)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Transcripts sent to a worker at a time")
+    parser.add_argument('--output', help="JSON Lines file to write (default: standard output)")
+    args = parser.parse_args(argv)
+
+    paths = collect_transcripts(args.source)
+    if not paths:
+        print("No transcripts found", file=sys.stderr)
+        return 1
+
+    failed = 0
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for number, (path, results, error) in enumerate(
+                analyze_transcript_files(paths, tasks=args.tasks, max_workers=args.workers, chunksize=args.chunksize), 1):
+            if error:
+                failed += 1
+                print(f"[{number}/{len(paths)}] FAILED {path}: {error}", file=sys.stderr)
+                continue
+            out.write(json.dumps({'path': path, **results}) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Finished: {len(paths) - failed} analysed, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Keyword scanner benchmark
+Compares the single-pass scanner behind extract_numbers_and_stats and
+identify_technical_terms with the previous implementation (four findall
+passes for numbers and two for technical terms, patterns compiled on the
+fly) on synthetic transcripts of increasing size
+
+Usage:
+    python keyword_benchmark.py --words 10000 100000 1000000 --repeat 5
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Callable
+
+from mock_servers import mock_transcript
+from keyword_utils import extract_numbers_and_stats, identify_technical_terms
+from text_analysis import scan_text
+
+STATS_SENTENCES = [
+    "In 1998 about 45.5% of the 3 million students in the USA took the course.",
+    "The NASA probe weighs 720 kg and travels 17 km every second.",
+    "By 2021 the MIT lab had cut energy use by 12 percent, roughly 40% of the 2 billion dollar budget.",
+]
+
+def _legacy_extract_numbers_and_stats(text: str) -> Dict[str, List[str]]:
+    """extract_numbers_and_stats before the scanner (including its year bug)"""
+    data = {'percentages': [], 'numbers': [], 'dates': [], 'measurements': []}
+    data['percentages'] = list(set(re.findall(r'\d+\.?\d*\s*%', text)))
+    data['numbers'] = list(set(re.findall(r'\d+\.?\d*\s+(?:million|billion|thousand|hundred)', text, re.IGNORECASE)))
+    data['dates'] = list(set(re.findall(r'\b(19|20)\d{2}\b', text)))
+    data['measurements'] = list(set(re.findall(r'\d+\.?\d*\s*(?:kg|g|m|cm|km|ml|l|°C|°F)', text)))
+    return data
+
+def _legacy_identify_technical_terms(text: str) -> List[str]:
+    """identify_technical_terms before the scanner"""
+    terms = re.findall(r'\b[A-Z]{2,}\b', text)
+    terms.extend(re.findall(r'(?<!^)(?<!\. )\b[A-Z][a-z]+\b', text))
+    term_freq = Counter(terms)
+    return [term for term, count in term_freq.items() if count > 1]
+
+def build_transcript(num_words: int, stats_every: int = 10) -> str:
+    """Mock lecture text with a sentence full of numbers after every stats_every sentences"""
+    sentences = re.split(r'(?<=\.) ', mock_transcript(num_words)[0])
+    for index in range(len(sentences) - 1, 0, -stats_every):
+        sentences.insert(index, STATS_SENTENCES[index % len(STATS_SENTENCES)])
+    return ' '.join(sentences)
+
+def _best_time(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(word_counts: List[int], repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    Time the legacy functions against the scanner
+
+    Args:
+        word_counts: Transcript sizes to test
+        repeat: Runs per measurement (the fastest is reported)
+
+    Returns:
+        One result per size with characters, findings, legacy/scanner
+        seconds and speedup
+    """
+    results = []
+    for num_words in word_counts:
+        text = build_transcript(num_words)
+
+        def legacy():
+            _legacy_extract_numbers_and_stats(text)
+            _legacy_identify_technical_terms(text)
+
+        def functions():
+            # Both public functions on a plain string, i.e. two scanner passes
+            extract_numbers_and_stats(text)
+            identify_technical_terms(text)
+
+        legacy_seconds = _best_time(legacy, repeat)
+        scanner_seconds = _best_time(lambda: scan_text(text), repeat)
+        results.append({
+            'words': num_words,
+            'characters': len(text),
+            'findings': len(scan_text(text)),
+            'legacy_seconds': legacy_seconds,
+            'scanner_seconds': scanner_seconds,
+            'functions_seconds': _best_time(functions, repeat),
+            'speedup': legacy_seconds / scanner_seconds if scanner_seconds else 0.0,
+        })
+    return results
+
+def format_report(results: List[Dict[str, float]]) -> str:
+    """Render benchmark results as a plain-text table"""
+    lines = [f"{'words':>10}{'chars':>12}{'findings':>10}{'legacy (s)':>12}{'scan (s)':>10}"
+             f"{'both fns (s)':>14}{'speedup':>9}"]
+    for result in results:
+        lines.append(f"{result['words']:>10,}{result['characters']:>12,}{result['findings']:>10,}"
+                     f"{result['legacy_seconds']:>12.4f}{result['scanner_seconds']:>10.4f}"
+                     f"{result['functions_seconds']:>14.4f}{result['speedup']:>8.1f}x")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the keyword scanner against the per-pattern functions")
+    parser.add_argument('--words', type=int, nargs='+', default=[10000, 100000, 500000], help="Transcript sizes in words")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.words, repeat=args.repeat)
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Multi-keyword matching
+An Aho-Corasick automaton finds every occurrence of every keyword in one
+pass over the text, instead of one search per keyword. Used to count
+keywords for the word cloud and to highlight them in notes and snippets.
+
+The automaton steps over word tokens rather than characters: the text is
+split by one regex (in C), so the Python loop runs once per word and
+keywords can only match whole words.
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import accumulate
+from typing import Optional, List, Tuple, Dict, Iterator, Callable, Iterable
+
+Match = Tuple[int, int, int]  # (start, end, keyword index)
+
+# A word or a single punctuation character, with the space before it if there
+# is one; further spaces become tokens of their own, so every character is covered
+_TOKEN = re.compile(r' ?(?:\w+|[^\w ])| ')
+
+# Every whitespace character becomes a space, keeping offsets unchanged
+_SPACES = {code: ' ' for code in range(0x3001) if chr(code).isspace()}
+
+def _normalize(text: str) -> str:
+    """Lowercase text and unify whitespace without changing its length"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters (e.g. 'İ') lowercase to two; keep only the first
+        lowered = ''.join(char.lower()[0] for char in text)
+    return lowered.translate(_SPACES)
+
+class KeywordMatcher:
+    """
+    Case-insensitive whole-word matcher for a fixed set of keywords
+
+    A keyword matches where the text has the same words and punctuation;
+    words in a multi-word keyword may be separated by any single
+    whitespace character. "network" does not match inside "networks", and
+    "neural networks" does not match "neural-networks".
+
+    Args:
+        keywords: Keywords or phrases to find; empty ones are ignored
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(keywords)
+
+        # Trie over the keyword tokens; state 0 is the root
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        self._lengths = []  # Keyword lengths in tokens
+        for index, keyword in enumerate(self.keywords):
+            tokens = _TOKEN.findall(_normalize(' '.join(keyword.split())))
+            self._lengths.append(len(tokens))
+            state = 0
+            for token in tokens:
+                following = goto[state].get(token)
+                if following is None:
+                    following = goto[state][token] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                    if state == 0:
+                        # A keyword may start after a space as well
+                        goto[0][' ' + token] = following
+                state = following
+            if state:
+                outputs[state].append(index)
+
+        # Breadth-first: resolve failure links into a full transition table.
+        # Transitions back to the root are left out, so a missing entry means state 0.
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(set(goto[0].values()))
+        while queue:
+            state = queue.popleft()
+            outputs[state] += outputs[fail[state]]
+            inherited = transitions[fail[state]]
+            table = transitions[state]
+            table.update(inherited)
+            for token, following in goto[state].items():
+                fail[following] = inherited.get(token, 0)
+                table[token] = following
+                queue.append(following)
+
+        self._transitions = transitions
+        self._outputs = [tuple(output) for output in outputs]
+
+    def finditer(self, text: str, lowered: Optional[str] = None) -> Iterator[Match]:
+        """
+        Every occurrence of every keyword, overlaps included
+
+        Args:
+            text: Text to search
+            lowered: text.lower(), if the caller already has it
+
+        Yields:
+            (start, end, keyword index) in order of the match end
+        """
+        normalized = _normalize(text) if lowered is None or len(lowered) != len(text) else lowered.translate(_SPACES)
+        tokens = _TOKEN.findall(normalized)
+        ends = None
+        transitions = self._transitions
+        outputs = self._outputs
+        lengths = self._lengths
+
+        state = 0
+        for position, token in enumerate(tokens):
+            state = transitions[state].get(token, 0)
+            if not outputs[state]:
+                continue
+            if ends is None:
+                ends = list(accumulate(map(len, tokens)))
+            for index in outputs[state]:
+                first = position - lengths[index] + 1
+                start = ends[first - 1] if first else 0
+                if tokens[first][0] == ' ' and len(tokens[first]) > 1:
+                    start += 1
+                yield start, ends[position], index
+
+    def first(self, text: str, lowered: Optional[str] = None) -> Optional[Match]:
+        """
+        The occurrence that starts first (the longest one if several do)
+
+        Scanning stops as soon as no later match can start earlier.
+        """
+        longest = max((len(keyword) for keyword in self.keywords), default=0)
+        best = None
+        for match in self.finditer(text, lowered):
+            if best is not None and match[1] - longest > best[0]:
+                break
+            if best is None or (match[0], match[0] - match[1]) < (best[0], best[0] - best[1]):
+                best = match
+        return best
+
+    def count(self, text: str, lowered: Optional[str] = None) -> Dict[str, int]:
+        """
+        Occurrences of each keyword
+
+        Returns:
+            Dictionary with keyword: count pairs for keywords that occur
+        """
+        counts = [0] * len(self.keywords)
+        for _, _, index in self.finditer(text, lowered):
+            counts[index] += 1
+        return {keyword: counts[index] for index, keyword in enumerate(self.keywords) if counts[index]}
+
+    def select(self, text: str, lowered: Optional[str] = None) -> List[Match]:
+        """
+        Non-overlapping matches, preferring the leftmost and then the longest
+
+        Returns:
+            Matches in text order
+        """
+        matches = sorted(self.finditer(text, lowered), key=lambda match: (match[0], match[0] - match[1]))
+        selected = []
+        covered = 0
+        for match in matches:
+            if match[0] >= covered:
+                selected.append(match)
+                covered = match[1]
+        return selected
+
+    def replace(self, text: str, replacement: Callable[[str, str], str], lowered: Optional[str] = None) -> str:
+        """
+        Replace non-overlapping matches
+
+        Args:
+            text: Text to rewrite
+            replacement: Called with (keyword, matched text), returns the new text
+
+        Returns:
+            Rewritten text
+        """
+        parts = []
+        previous = 0
+        for start, end, index in self.select(text, lowered):
+            parts.append(text[previous:start])
+            parts.append(replacement(self.keywords[index], text[start:end]))
+            previous = end
+        parts.append(text[previous:])
+        return ''.join(parts)
+
+@lru_cache(maxsize=32)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+def get_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """
+    Return a matcher for a keyword list, reusing one built for the same list
+    """
+    return _cached_matcher(tuple(keywords))
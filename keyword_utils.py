@@ -1,7 +1,13 @@
-import re
+import math
+from array import array
+import hashlib
 from collections import Counter
-from typing import List, Set, Dict
-import string
+from typing import Optional, List, Set, Dict, Tuple, Iterator, Union
+
+from text_analysis import TextAnalysis, Finding, analyze, scan_text, WORD_PATTERN
+from keyword_matcher import get_matcher
+from document_frequency import DocumentFrequencyStore, get_document_frequency_store
+from ngram_counter import count_ngrams, unpack_ngram, ID_BITS, ID_MASK, DEFAULT_EPSILON
 
 # Common English stop words
 STOP_WORDS = {
@@ -14,80 +20,157 @@ STOP_WORDS = {
     'can', 'just', 'should', 'now', 'i', 'you', 'we', 'our', 'your', 'their'
 }
 
-def extract_keywords_statistical(text: str, top_n: int = 20) -> List[str]:
+KEYWORD_RANKINGS = ('frequency', 'tfidf', 'bm25')
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def extract_keywords_statistical(
+    text: Union[str, TextAnalysis],
+    top_n: int = 20,
+    ranking: str = 'frequency',
+    store: Optional[DocumentFrequencyStore] = None
+) -> List[str]:
     """
     Extract keywords using statistical frequency analysis
     
+    'tfidf' and 'bm25' weigh each word's frequency by how rare it is
+    across previously processed lectures (see record_document), so words
+    every lecture uses drop out. With no lectures recorded they rank like
+    'frequency'.
+    
     Args:
-        text: Input text
+        text: Input text or its TextAnalysis
         top_n: Number of top keywords to return
+        ranking: 'frequency', 'tfidf' or 'bm25'
+        store: Document frequencies (the process-wide store if None)
         
     Returns:
         List of keywords sorted by importance
     """
-    # Convert to lowercase and tokenize
-    text = text.lower()
-    
-    # Remove punctuation
-    translator = str.maketrans('', '', string.punctuation)
-    text = text.translate(translator)
-    
-    # Split into words
-    words = text.split()
-    
-    # Filter out stop words and short words
-    filtered_words = [
-        word for word in words 
-        if word not in STOP_WORDS and len(word) > 3
-    ]
-    
-    # Count frequencies
-    word_freq = Counter(filtered_words)
+    if ranking not in KEYWORD_RANKINGS:
+        raise ValueError(f"Unsupported ranking '{ranking}', expected one of {', '.join(KEYWORD_RANKINGS)}")
+    
+    analysis = analyze(text)
+    vocab = analysis.vocab
+    
+    # Filter out stop words and short words (once per distinct word)
+    word_freq = Counter({
+        token_id: count for token_id, count in analysis.counts.items()
+        if vocab[token_id] not in STOP_WORDS and len(vocab[token_id]) > 3
+    })
+    
+    if ranking != 'frequency':
+        store = store or get_document_frequency_store()
+        if store is not None and store.documents:
+            if ranking == 'tfidf':
+                scores = {token_id: (1 + math.log(count)) * store.idf(vocab[token_id])
+                          for token_id, count in word_freq.items()}
+            else:
+                average_length = store.average_length or len(analysis)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * len(analysis) / average_length)
+                scores = {token_id: store.idf(vocab[token_id]) * count * (BM25_K1 + 1) / (count + norm)
+                          for token_id, count in word_freq.items()}
+            word_freq = Counter(scores)
     
     # Get top N keywords
-    keywords = [word for word, _ in word_freq.most_common(top_n)]
+    keywords = [vocab[token_id] for token_id, _ in word_freq.most_common(top_n)]
     
     return keywords
 
-def extract_noun_phrases(text: str) -> List[str]:
+def record_document(
+    text: Union[str, TextAnalysis],
+    store: Optional[DocumentFrequencyStore] = None,
+    document_id: Optional[str] = None
+) -> bool:
     """
-    Extract potential noun phrases (2-3 word combinations)
+    Add a lecture to the document-frequency store used for TF-IDF/BM25
     
     Args:
-        text: Input text
+        text: Transcript or its TextAnalysis
+        store: Document frequencies (the process-wide store if None)
+        document_id: Stable id; defaults to a hash of the text, so the same
+            transcript is only counted once
         
     Returns:
-        List of noun phrases
+        True if the lecture was added
     """
-    # Simple pattern: Adjective + Noun or Noun + Noun
-    # This is a basic implementation; a full NLP library would be better
-    
-    text = text.lower()
-    
-    # Split into sentences
-    sentences = re.split(r'[.!?]+', text)
+    analysis = analyze(text)
+    store = store or get_document_frequency_store()
+    if store is None:
+        return False
+    if document_id is None:
+        document_id = hashlib.sha256(analysis.text.encode('utf-8')).hexdigest()
+    try:
+        return store.add_document(analysis.vocab, len(analysis), document_id=document_id)
+    except OSError as e:
+        # Corpus statistics are optional; never fail the pipeline over them
+        print(f"Error updating document frequencies: {str(e)}")
+        return False
+
+LOSSY_COUNT_MIN_TOKENS = 1_000_000  # Longer inputs count phrases approximately, in bounded memory
+
+def iter_phrase_keys(text: Union[str, TextAnalysis]) -> Iterator[int]:
+    """
+    Generate the 2-3 word phrases of a text that pass is_valid_phrase
     
-    phrases = []
+    The rules are evaluated once per distinct word, and each phrase is
+    yielded as an integer packed from its token ids, so no strings or
+    lists are built per phrase.
     
-    for sentence in sentences:
-        words = sentence.split()
+    Args:
+        text: Input text or its TextAnalysis
         
-        # Look for 2-3 word phrases
-        for i in range(len(words) - 1):
+    Yields:
+        Keys from ngram_counter.pack_ngram
+    """
+    analysis = analyze(text)
+    token_ids = analysis.token_ids
+    edge_ok = [word not in STOP_WORDS for word in analysis.vocab]
+    long_word = [len(word) > 3 for word in analysis.vocab]
+    if len(analysis.vocab) > ID_MASK:
+        raise ValueError("Vocabulary too large to pack phrases")
+    
+    for first, last in analysis.sentence_spans():
+        for i in range(first, last - 1):
+            a = token_ids[i]
+            if not edge_ok[a]:
+                continue
+            b = token_ids[i + 1]
+            
             # 2-word phrase
-            phrase = f"{words[i]} {words[i+1]}"
-            if is_valid_phrase(phrase):
-                phrases.append(phrase)
+            if edge_ok[b] and (long_word[a] or long_word[b]):
+                yield (a | b << ID_BITS) << 2 | 2
             
             # 3-word phrase
-            if i < len(words) - 2:
-                phrase = f"{words[i]} {words[i+1]} {words[i+2]}"
-                if is_valid_phrase(phrase):
-                    phrases.append(phrase)
+            if i < last - 2:
+                c = token_ids[i + 2]
+                if edge_ok[c] and (long_word[a] or long_word[b] or long_word[c]):
+                    yield (a | b << ID_BITS | c << 2 * ID_BITS) << 2 | 3
+
+def extract_noun_phrases(text: Union[str, TextAnalysis], epsilon: Optional[float] = None) -> List[str]:
+    """
+    Extract potential noun phrases (2-3 word combinations)
+    
+    Args:
+        text: Input text or its TextAnalysis
+        epsilon: Error bound for approximate counting; by default counts
+            are exact unless the text has over LOSSY_COUNT_MIN_TOKENS words
+        
+    Returns:
+        List of noun phrases
+    """
+    # Simple pattern: Adjective + Noun or Noun + Noun
+    # This is a basic implementation; a full NLP library would be better
+    
+    analysis = analyze(text)
+    if epsilon is None and len(analysis) > LOSSY_COUNT_MIN_TOKENS:
+        epsilon = DEFAULT_EPSILON
     
     # Count and return most common
-    phrase_freq = Counter(phrases)
-    return [phrase for phrase, count in phrase_freq.most_common(15) if count > 1]
+    phrase_freq = count_ngrams(iter_phrase_keys(analysis), epsilon)
+    vocab = analysis.vocab
+    return [' '.join(vocab[token_id] for token_id in unpack_ngram(key))
+            for key, count in phrase_freq.most_common(15) if count > 1]
 
 def is_valid_phrase(phrase: str) -> bool:
     """
@@ -115,119 +198,280 @@ def is_valid_phrase(phrase: str) -> bool:
     
     return True
 
-def identify_technical_terms(text: str) -> List[str]:
+def _findings(text: Union[str, TextAnalysis]) -> List[Finding]:
+    return text.findings if isinstance(text, TextAnalysis) else scan_text(text)
+
+def identify_technical_terms(text: Union[str, TextAnalysis]) -> List[str]:
     """
     Identify potential technical terms (capitalized words, acronyms, etc.)
     
     Args:
-        text: Input text
+        text: Input text or its TextAnalysis
         
     Returns:
         List of technical terms
     """
-    terms = []
-    
-    # Find all-caps words (acronyms)
-    acronyms = re.findall(r'\b[A-Z]{2,}\b', text)
-    terms.extend(acronyms)
-    
-    # Find capitalized words (not at sentence start)
-    capitalized = re.findall(r'(?<!^)(?<!\. )\b[A-Z][a-z]+\b', text)
-    terms.extend(capitalized)
+    # Acronyms anywhere, capitalized words when not starting a sentence
+    terms = [value for kind, value, _, _ in _findings(text) if kind in ('acronym', 'capitalized')]
     
     # Count and return unique terms that appear multiple times
     term_freq = Counter(terms)
     return [term for term, count in term_freq.items() if count > 1]
 
-def extract_numbers_and_stats(text: str) -> Dict[str, List[str]]:
+MAX_PHRASE_WORDS = 3
+TECHNICAL_TERM_BOOST = 1.5
+
+# Function words and spoken fillers that also end a candidate phrase when ranking
+PHRASE_BREAK_WORDS = STOP_WORDS | {
+    'about', 'above', 'after', 'again', 'also', 'am', 'any', 'because', 'been', 'before',
+    'being', 'below', 'between', 'could', 'did', 'do', 'does', 'down', 'during', 'going',
+    'her', 'here', 'him', 'his', 'if', 'into', 'let', 'like', 'may', 'me', 'might', 'must',
+    'my', 'off', 'once', 'or', 'out', 'over', 'she', 'them', 'then', 'there', 'these',
+    'those', 'through', 'under', 'until', 'up', 'us', 'use', 'were', 'while', 'would',
+    'actually', 'basically', 'gonna', 'kind', 'know', 'lot', 'okay', 'really', 'right',
+    'so', 'sort', 'think', 'um', 'uh', 'well', 'yeah',
+}
+
+def rank_keywords(text: Union[str, TextAnalysis], top_n: int = 10) -> List[str]:
     """
-    Extract numbers, percentages, and statistics from text
+    Rank keywords and key phrases locally, without an API call
+    
+    RAKE-style scoring: stop words and punctuation split the text into
+    runs of content words, and every phrase of up to MAX_PHRASE_WORDS words
+    inside a run is a candidate. Each word scores its co-occurrence degree
+    divided by its frequency, and a phrase scores the sum of its words.
+    Scores are weighted by how often the phrase occurs, and technical terms
+    (acronyms, capitalized names) get a boost. A candidate contained in a
+    better ranked phrase (or containing one) is skipped, and so is one whose
+    occurrences mostly fall in the runs of better ranked phrases, so the
+    windows of one long run are not all returned.
     
     Args:
-        text: Input text
+        text: Input text or its TextAnalysis
+        top_n: Number of keywords to return
         
     Returns:
-        Dictionary with categories of numerical data
+        List of keywords sorted by importance, in their most common spelling
     """
-    data = {
-        'percentages': [],
-        'numbers': [],
-        'dates': [],
-        'measurements': []
-    }
+    analysis = analyze(text)
+    vocab = analysis.vocab
+    token_ids = analysis.token_ids
+    surface_ids = analysis.surface_ids
+    
+    # Words that may appear in a phrase, decided once per distinct word
+    content = [word not in PHRASE_BREAK_WORDS and not word.isdigit() and len(word) > 1 for word in vocab]
+    
+    candidates: Dict[tuple, List[int]] = {}  # Phrase -> start positions
+    spellings: Dict[tuple, Counter] = {}
+    word_freq = Counter()
+    word_degree = Counter()
+    runs = 0
+    run_of = array('I', [0]) * len(analysis)  # Token position -> run number
+    
+    for first, last in analysis.clause_spans():
+        position = first
+        while position < last:
+            if not content[token_ids[position]]:
+                position += 1
+                continue
+            
+            # A run of content words ends at a break word or punctuation;
+            # every phrase of up to MAX_PHRASE_WORDS words inside it is a candidate
+            run_end = position
+            while run_end < last and content[token_ids[run_end]]:
+                run_end += 1
+            degree = min(run_end - position, MAX_PHRASE_WORDS)
+            run_of[position:run_end] = array('I', [runs]) * (run_end - position)
+            runs += 1
+            
+            for i in range(position, run_end):
+                for n in range(1, min(MAX_PHRASE_WORDS, run_end - i) + 1):
+                    phrase = tuple(token_ids[i:i + n])
+                    if n > 1 or len(vocab[phrase[0]]) > 3 or analysis.surfaces[surface_ids[i]].isupper():
+                        candidates.setdefault(phrase, []).append(i)
+                        spellings.setdefault(phrase, Counter())[tuple(surface_ids[i:i + n])] += 1
+                word_freq[token_ids[i]] += 1
+                word_degree[token_ids[i]] += degree
+            position = run_end
+    
+    if not candidates:
+        return []
+    
+    technical = {analysis.id_of(term) for term in identify_technical_terms(analysis)}
+    
+    scores = {}
+    for phrase, starts in candidates.items():
+        count = len(starts)
+        if len(phrase) > 1 and count < 2:
+            continue  # Phrases seen once are mostly accidental word runs
+        score = sum(word_degree[w] / word_freq[w] for w in phrase) * (1 + math.log(count))
+        if any(w in technical for w in phrase):
+            score *= TECHNICAL_TERM_BOOST
+        scores[phrase] = score
+    
+    keywords = []
+    selected = []
+    used_runs = bytearray(runs)  # Runs a selected phrase was taken from
+    for phrase in sorted(scores, key=lambda p: (-scores[p], p)):
+        padded = f" {' '.join(vocab[w] for w in phrase)} "
+        if any(padded in other or other in padded for other in selected):
+            continue
+        starts = candidates[phrase]
+        if 2 * sum(used_runs[run_of[start]] for start in starts) > len(starts):
+            continue
+        selected.append(padded)
+        for start in starts:
+            used_runs[run_of[start]] = 1
+        spelling = spellings[phrase].most_common(1)[0][0]
+        keywords.append(' '.join(analysis.surfaces[surface_id] for surface_id in spelling))
+        if len(keywords) >= top_n:
+            break
     
-    # Percentages
-    percentages = re.findall(r'\d+\.?\d*\s*%', text)
-    data['percentages'] = list(set(percentages))
+    return keywords
+
+NUMERIC_CATEGORIES = {
+    'percentage': 'percentages',
+    'number': 'numbers',
+    'year': 'dates',
+    'measurement': 'measurements',
+}
+
+def extract_numbers_and_stats(text: Union[str, TextAnalysis]) -> Dict[str, List[str]]:
+    """
+    Extract numbers, percentages, and statistics from text
     
-    # Numbers with context
-    numbers = re.findall(r'\d+\.?\d*\s+(?:million|billion|thousand|hundred)', text, re.IGNORECASE)
-    data['numbers'] = list(set(numbers))
+    Use text_analysis.scan_text for the same findings with character offsets.
     
-    # Years
-    years = re.findall(r'\b(19|20)\d{2}\b', text)
-    data['dates'] = list(set(years))
+    Args:
+        text: Input text or its TextAnalysis
+        
+    Returns:
+        Dictionary with categories of numerical data (unique values in order of appearance)
+    """
+    data = {category: {} for category in NUMERIC_CATEGORIES.values()}
     
-    # Measurements
-    measurements = re.findall(r'\d+\.?\d*\s*(?:kg|g|m|cm|km|ml|l|°C|°F)', text)
-    data['measurements'] = list(set(measurements))
+    for kind, value, _, _ in _findings(text):
+        category = NUMERIC_CATEGORIES.get(kind)
+        if category:
+            data[category][value] = None
     
-    return data
+    return {category: list(values) for category, values in data.items()}
 
-def create_keyword_cloud_data(keywords: List[str], text: str) -> Dict[str, int]:
+def create_keyword_cloud_data(keywords: List[str], text: Union[str, TextAnalysis]) -> Dict[str, int]:
     """
     Create data for a word cloud with keyword frequencies
     
+    Whole-word occurrences of all keywords are counted in one pass.
+    
     Args:
         keywords: List of keywords
-        text: Original text
+        text: Original text or its TextAnalysis
         
     Returns:
         Dictionary with keyword: frequency pairs
     """
-    text_lower = text.lower()
+    matcher = get_matcher(keywords)
+    if isinstance(text, TextAnalysis):
+        return matcher.count(text.text, lowered=text.lower)
+    return matcher.count(text)
+
+RELATED_SCORING = ('count', 'pmi')
+
+def _keyword_occurrences(keyword: str, analysis: TextAnalysis) -> Tuple[List[int], int, Set[int]]:
+    """
+    Where a keyword occurs: (start positions, length in tokens, token ids it covers)
+    
+    A one-word keyword matches every word containing it (so "network" also
+    finds "networks"); a phrase must match word for word.
+    """
+    words = WORD_PATTERN.findall(keyword.lower())
+    if len(words) == 1:
+        matching = {token_id for token_id, word in enumerate(analysis.vocab) if words[0] in word}
+        positions = sorted(position for token_id in matching for position in analysis.positions(token_id))
+        return positions, 1, matching
+    matching = {analysis.id_of(word) for word in words}
+    return analysis.phrase_positions(words), len(words), matching
+
+def find_related_terms_bulk(
+    keywords: List[str],
+    text: Union[str, TextAnalysis],
+    window_size: int = 20,
+    top_n: int = 10,
+    scoring: str = 'count',
+    min_count: int = 2
+) -> Dict[str, List[str]]:
+    """
+    Find terms that frequently appear near each of several keywords
+    
+    Occurrences come from the positional index of the TextAnalysis, so
+    only the windows around the keywords are read, never the whole text
+    once per keyword.
+    
+    Args:
+        keywords: Keywords to analyze
+        text: Full text or its TextAnalysis
+        window_size: Number of words to look at on each side of a keyword
+        top_n: Number of related terms per keyword
+        scoring: 'count' ranks by co-occurrences; 'pmi' by pointwise mutual
+            information, which favours terms specific to the keyword over
+            terms that are frequent everywhere
+        min_count: With PMI, ignore terms seen fewer times near the keyword
+        
+    Returns:
+        Dictionary with keyword: related terms pairs
+    """
+    if scoring not in RELATED_SCORING:
+        raise ValueError(f"Unsupported scoring '{scoring}', expected one of {', '.join(RELATED_SCORING)}")
+    
+    analysis = analyze(text)
+    vocab = analysis.vocab
+    token_ids = analysis.token_ids
+    total = len(token_ids)
+    keep = [word not in STOP_WORDS and len(word) > 3 for word in vocab]
     
-    keyword_freq = {}
+    related = {}
     for keyword in keywords:
-        count = text_lower.count(keyword.lower())
-        if count > 0:
-            keyword_freq[keyword] = count
+        positions, length, own_ids = _keyword_occurrences(keyword, analysis)
+        
+        # Count surrounding words in every window
+        cooccurrences = Counter()
+        window_tokens = 0
+        for position in positions:
+            start = max(0, position - window_size)
+            end = min(total, position + length + window_size)
+            cooccurrences.update(token_ids[start:position])
+            cooccurrences.update(token_ids[position + length:end])
+            window_tokens += end - start - length
+        
+        candidates = {token_id: count for token_id, count in cooccurrences.items()
+                      if keep[token_id] and token_id not in own_ids}
+        
+        if scoring == 'pmi':
+            # log(P(term | near keyword) / P(term))
+            counts = analysis.counts
+            scores = {token_id: math.log(count * total / (window_tokens * counts[token_id]))
+                      for token_id, count in candidates.items() if count >= min_count}
+        else:
+            scores = candidates
+        
+        ranked = sorted(scores, key=lambda token_id: (-scores[token_id], token_id))
+        related[keyword] = [vocab[token_id] for token_id in ranked[:top_n]]
     
-    return keyword_freq
+    return related
 
-def find_related_terms(keyword: str, text: str, window_size: int = 20) -> List[str]:
+def find_related_terms(keyword: str, text: Union[str, TextAnalysis], window_size: int = 20) -> List[str]:
     """
     Find terms that frequently appear near a keyword
     
     Args:
         keyword: The keyword to analyze
-        text: Full text
+        text: Full text or its TextAnalysis
         window_size: Number of words to look at around the keyword
         
     Returns:
         List of related terms
     """
-    text_lower = text.lower()
-    keyword_lower = keyword.lower()
-    
-    # Find all occurrences
-    words = text_lower.split()
-    related = []
-    
-    for i, word in enumerate(words):
-        if keyword_lower in word:
-            # Get surrounding words
-            start = max(0, i - window_size)
-            end = min(len(words), i + window_size + 1)
-            
-            context_words = words[start:i] + words[i+1:end]
-            related.extend(context_words)
-    
-    # Filter and count
-    filtered = [w for w in related if w not in STOP_WORDS and len(w) > 3]
-    word_freq = Counter(filtered)
-    
-    return [word for word, _ in word_freq.most_common(10)]
+    return find_related_terms_bulk([keyword], text, window_size)[keyword]
 
 def categorize_keywords(keywords: List[str]) -> Dict[str, List[str]]:
     """
@@ -266,36 +510,35 @@ def categorize_keywords(keywords: List[str]) -> Dict[str, List[str]]:
     
     return {k: v for k, v in categories.items() if v}  # Remove empty categories
 
-def highlight_keywords_in_text(text: str, keywords: List[str], max_length: int = 500) -> str:
+def highlight_keywords_in_text(text: Union[str, TextAnalysis], keywords: List[str], max_length: int = 500) -> str:
     """
     Create a snippet of text with keywords highlighted
     
     Args:
-        text: Original text
+        text: Original text or its TextAnalysis
         keywords: Keywords to highlight
         max_length: Maximum length of snippet
         
     Returns:
         Text snippet with highlighted keywords
     """
-    # Find first occurrence of any keyword
-    text_lower = text.lower()
-    first_pos = len(text)
+    matcher = get_matcher(keywords)
     
-    for keyword in keywords:
-        pos = text_lower.find(keyword.lower())
-        if pos != -1 and pos < first_pos:
-            first_pos = pos
+    # Find first occurrence of any keyword
+    if isinstance(text, TextAnalysis):
+        first = matcher.first(text.text, lowered=text.lower)
+        text = text.text
+    else:
+        first = matcher.first(text)
+    first_pos = first[0] if first else len(text)
     
     # Extract snippet around first keyword
     start = max(0, first_pos - 100)
     end = min(len(text), start + max_length)
     snippet = text[start:end]
     
-    # Highlight keywords
-    for keyword in keywords:
-        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-        snippet = pattern.sub(f"**{keyword}**", snippet)
+    # Highlight keywords (whole words, longest match first, never nested)
+    snippet = matcher.replace(snippet, lambda keyword, matched: f"**{keyword}**")
     
     if start > 0:
         snippet = "..." + snippet
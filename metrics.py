@@ -0,0 +1,315 @@
+"""
+Pipeline metrics
+Records a timed span for every pipeline stage (upload, transcription,
+keyword extraction, note generation, formatting, ...) with byte and token
+counts attached, aggregates them into per-stage histograms, and serves
+them as Prometheus text or JSON. Spans can also be appended to a JSONL
+log and replayed later to compare runs.
+
+Usage:
+    LECTUREAI_METRICS_PORT=9108 streamlit run app.py   # live endpoint
+    python metrics.py replay metrics.jsonl [--json]     # statistics from a log
+    python metrics.py serve metrics.jsonl --port 9108   # endpoint for a log
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Iterator, List
+
+# Histogram bucket upper bounds in seconds, from a single Groq call up to a long transcription
+BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0]
+
+class StageStats:
+    """Histogram of span durations plus totals of numeric attributes for one stage"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # Last bucket is +Inf
+        self.totals: Dict[str, float] = {}
+
+    def add(self, seconds: float, error: bool, attributes: Dict[str, Any]) -> None:
+        self.count += 1
+        self.errors += int(error)
+        self.seconds += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        for name, value in attributes.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.totals[name] = self.totals.get(name, 0) + value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile from the histogram (upper bound of the bucket it falls in)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return BUCKETS[index] if index < len(BUCKETS) else float('inf')
+        return float('inf')
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of stage histograms
+
+    Args:
+        log_path: Optional JSONL file every span is appended to
+    """
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = log_path
+        self._stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, error: bool = False, **attributes) -> None:
+        """
+        Record one finished span
+
+        Args:
+            stage: Stage name, e.g. 'transcription'
+            seconds: Duration of the span
+            error: Whether the stage failed
+            **attributes: Extra data; numeric values (bytes, tokens) are summed per stage
+        """
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.add(seconds, error, attributes)
+
+            if self.log_path:
+                entry = {'stage': stage, 'seconds': seconds, 'error': error, 'time': time.time(), **attributes}
+                try:
+                    with open(self.log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry, default=str) + '\n')
+                except OSError as e:
+                    print(f"Error writing metrics log: {str(e)}")
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block of code as one stage
+
+        Yields a dict; attributes added to it (e.g. span['tokens'] = 512)
+        are recorded with the span. An exception marks the span as failed
+        and is re-raised.
+        """
+        data = dict(attributes)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield data
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, error=error, **data)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Current metrics as plain data
+
+        Returns:
+            Dictionary with stage names as keys and count, errors, total
+            seconds, mean/p50/p95/p99 seconds, buckets and attribute totals
+        """
+        with self._lock:
+            return {
+                stage: {
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'seconds': stats.seconds,
+                    'mean': stats.seconds / stats.count if stats.count else 0.0,
+                    'p50': stats.quantile(0.5),
+                    'p95': stats.quantile(0.95),
+                    'p99': stats.quantile(0.99),
+                    'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], stats.buckets)),
+                    'totals': dict(stats.totals),
+                }
+                for stage, stats in sorted(self._stages.items())
+            }
+
+    def render_prometheus(self) -> str:
+        """Current metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP lectureai_stage_seconds Time spent in each pipeline stage",
+            "# TYPE lectureai_stage_seconds histogram",
+        ]
+        totals = {}
+        with self._lock:
+            stages = sorted(self._stages.items())
+            for stage, stats in stages:
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS + ['+Inf'], stats.buckets):
+                    cumulative += bucket
+                    lines.append(f'lectureai_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'lectureai_stage_seconds_sum{{stage="{stage}"}} {stats.seconds}')
+                lines.append(f'lectureai_stage_seconds_count{{stage="{stage}"}} {stats.count}')
+                for name, value in stats.totals.items():
+                    totals.setdefault(name, []).append((stage, value))
+
+            lines.append("# HELP lectureai_stage_errors_total Failed spans per pipeline stage")
+            lines.append("# TYPE lectureai_stage_errors_total counter")
+            for stage, stats in stages:
+                lines.append(f'lectureai_stage_errors_total{{stage="{stage}"}} {stats.errors}')
+
+        for name, values in sorted(totals.items()):
+            lines.append(f"# TYPE lectureai_stage_{name}_total counter")
+            for stage, value in values:
+                lines.append(f'lectureai_stage_{name}_total{{stage="{stage}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+def replay(log_path: str) -> MetricsRegistry:
+    """
+    Rebuild histograms from a JSONL metrics log
+
+    Args:
+        log_path: File written with LECTUREAI_METRICS_LOG
+
+    Returns:
+        Registry holding every span from the log
+    """
+    registry = MetricsRegistry()
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            stage = entry.pop('stage')
+            seconds = entry.pop('seconds')
+            error = entry.pop('error', False)
+            entry.pop('time', None)
+            registry.record(stage, seconds, error=error, **entry)
+    return registry
+
+def format_snapshot(snapshot: Dict[str, Dict[str, Any]]) -> str:
+    """Render a snapshot as a plain-text table"""
+    lines = [f"{'stage':<16}{'count':>8}{'errors':>8}{'mean (s)':>10}{'p50 (s)':>10}{'p95 (s)':>10}  totals"]
+    for stage, stats in snapshot.items():
+        totals = ', '.join(f"{name}={value:,.0f}" for name, value in stats['totals'].items())
+        lines.append(f"{stage:<16}{stats['count']:>8}{stats['errors']:>8}{stats['mean']:>10.2f}"
+                     f"{stats['p50']:>10g}{stats['p95']:>10g}  {totals}")
+    return '\n'.join(lines)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        registry = self.server.registry
+        if self.path.rstrip('/') in ('', '/metrics'):
+            body = registry.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4'
+        elif self.path.rstrip('/') == '/metrics.json':
+            body = json.dumps(registry.snapshot(), indent=2).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(registry: Optional['MetricsRegistry'] = None, port: int = 9108,
+                         host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a daemon thread
+
+    Args:
+        registry: Registry to expose (the process-wide one if None)
+        port: Port to listen on (0 picks a free one)
+        host: Interface to bind
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry or get_metrics()
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Return the process-wide metrics registry
+
+    LECTUREAI_METRICS_LOG names a JSONL file every span is appended to.
+    LECTUREAI_METRICS_PORT starts the metrics endpoint on that port.
+    """
+    global _metrics, _metrics_server
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry(log_path=os.getenv("LECTUREAI_METRICS_LOG") or None)
+            port = os.getenv("LECTUREAI_METRICS_PORT")
+            if port:
+                try:
+                    _metrics_server = start_metrics_server(_metrics, port=int(port),
+                                                           host=os.getenv("LECTUREAI_METRICS_HOST", '127.0.0.1'))
+                except OSError as e:
+                    # Another process (e.g. a second Streamlit worker) already serves the port
+                    print(f"Metrics endpoint not started on port {port}: {str(e)}")
+        return _metrics
+
+def span(stage: str, **attributes):
+    """Shortcut for get_metrics().span(stage, **attributes)"""
+    return get_metrics().span(stage, **attributes)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve or replay LectureAI pipeline metrics")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="Serve metrics replayed from a log, refreshed on every request")
+    serve.add_argument('log', help="JSONL metrics log")
+    serve.add_argument('--port', type=int, default=9108)
+    serve.add_argument('--host', default='127.0.0.1')
+    show = commands.add_parser('replay', help="Print per-stage statistics from a log")
+    show.add_argument('log', help="JSONL metrics log")
+    show.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    show.add_argument('--prometheus', action='store_true', help="Print Prometheus text instead of a table")
+    args = parser.parse_args(argv)
+
+    if args.command == 'replay':
+        registry = replay(args.log)
+        if args.json:
+            print(json.dumps(registry.snapshot(), indent=2))
+        elif args.prometheus:
+            print(registry.render_prometheus(), end='')
+        else:
+            print(format_snapshot(registry.snapshot()))
+        return 0
+
+    class _ReplayRegistry:
+        def render_prometheus(self):
+            return replay(args.log).render_prometheus()
+
+        def snapshot(self):
+            return replay(args.log).snapshot()
+
+    server = start_metrics_server(_ReplayRegistry(), port=args.port, host=args.host)
+    print(f"Serving metrics from {args.log} on http://{args.host}:{server.server_address[1]}/metrics")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
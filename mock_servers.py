@@ -0,0 +1,344 @@
+"""
+Local stand-ins for the Groq and AssemblyAI HTTP APIs
+Used for load testing the pipeline without spending API quota. Each server
+has a profile controlling its latency, error rate and throughput.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any, Tuple
+
+_LECTURE_SENTENCES = [
+    "Today we are going to talk about thermodynamics and the laws that govern energy transfer.",
+    "The first law states that energy cannot be created or destroyed, only converted from one form to another.",
+    "Entropy is a measure of the disorder of a system, and in an isolated system it never decreases.",
+    "Consider a heat engine operating between a hot reservoir at 500 kelvin and a cold reservoir at 300 kelvin.",
+    "Its maximum efficiency is given by the Carnot efficiency, which here works out to 40 percent.",
+    "In practice real engines reach far lower efficiencies because of friction and heat losses.",
+    "A refrigerator is essentially a heat engine running in reverse, moving heat from cold to hot.",
+    "The second law tells us that this requires work to be done on the system.",
+]
+
+class MockProfile:
+    """
+    Behaviour of a mock server
+
+    Args:
+        latency_ms: Base latency added to every request
+        jitter_ms: Random extra latency, uniformly distributed in [0, jitter_ms]
+        error_rate: Fraction of requests answered with an error
+        error_status: HTTP status used for injected errors (429 adds Retry-After)
+        tokens_per_second: Completion throughput of the mock LLM (0 for instant)
+        transcription_seconds: Time a mock transcription job takes to complete
+        transcript_words: Length of the mock transcript
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 20.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        tokens_per_second: float = 0.0,
+        transcription_seconds: float = 1.0,
+        transcript_words: int = 2000
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tokens_per_second = tokens_per_second
+        self.transcription_seconds = transcription_seconds
+        self.transcript_words = transcript_words
+
+    def delay(self) -> None:
+        """Sleep for the base latency plus jitter"""
+        time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000.0)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+def mock_transcript(num_words: int) -> Tuple[str, list]:
+    """
+    Build a synthetic lecture transcript with word timestamps
+
+    Returns:
+        Tuple of (text, words) where words use AssemblyAI's word format
+    """
+    words = []
+    offset = 0
+    sentences = []
+    while len(words) < num_words:
+        sentence = _LECTURE_SENTENCES[len(sentences) % len(_LECTURE_SENTENCES)]
+        sentences.append(sentence)
+        for token in sentence.split():
+            duration = 120 + 20 * len(token)
+            words.append({'text': token, 'start': offset, 'end': offset + duration, 'confidence': 0.98})
+            offset += duration + 60
+    return ' '.join(sentences), words
+
+def _mock_completion_text(messages: list, max_tokens: int) -> str:
+    """Plausible completion for the prompts api_models sends"""
+    prompt = messages[-1].get('content', '') if messages else ''
+    if 'comma-separated list' in prompt:
+        match = re.search(r'Extract the (\d+)', prompt)
+        count = int(match.group(1)) if match else 10
+        terms = ['thermodynamics', 'entropy', 'energy', 'heat engine', 'Carnot efficiency',
+                 'first law', 'second law', 'refrigerator', 'reservoir', 'work', 'friction', 'heat loss']
+        return ', '.join(terms[:count])
+    if 'summary' in prompt.lower():
+        return ' '.join(_LECTURE_SENTENCES[:3])
+
+    lines = ["## OVERVIEW", _LECTURE_SENTENCES[0], "", "## KEY CONCEPTS"]
+    for sentence in _LECTURE_SENTENCES[1:]:
+        lines.append(f"- {sentence}")
+    lines += ["", "## KEY TAKEAWAYS", "- Energy is conserved", "- Entropy of an isolated system never decreases",
+              "", "## QUESTIONS FOR REVIEW", "1. Why can no engine reach 100% efficiency?"]
+    text = '\n'.join(lines)
+    # Roughly four characters per token
+    return text[:max(200, min(len(text), max_tokens * 4))]
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'LectureAIMock/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def profile(self) -> MockProfile:
+        return self.server.profile
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            return self.rfile.read(length)
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            data = []
+            while True:
+                size = int(self.rfile.readline().strip() or b'0', 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                data.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(data)
+        return b''
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self) -> bool:
+        """Answer with the profile's error status if this request is chosen to fail"""
+        if not self.profile.should_fail():
+            return False
+        status = self.profile.error_status
+        headers = {'Retry-After': '1'} if status == 429 else None
+        self._send_json(status, {'error': {'message': 'Injected failure', 'type': 'mock_error'}}, headers)
+        with self.server.lock:
+            self.server.counters['errors'] += 1
+        return True
+
+    def _count(self) -> None:
+        with self.server.lock:
+            self.server.counters['requests'] += 1
+
+class _GroqHandler(_MockHandler):
+    def do_POST(self):
+        self._count()
+        body = self._read_body()
+        self.profile.delay()
+        if self._maybe_fail():
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        request = json.loads(body or b'{}')
+        content = _mock_completion_text(request.get('messages', []), request.get('max_tokens') or 1024)
+        completion_tokens = max(1, len(content) // 4)
+        prompt_tokens = sum(len(m.get('content', '')) for m in request.get('messages', [])) // 4
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get('model', 'mock')
+
+        if request.get('stream'):
+            self._stream(completion_id, model, content)
+            return
+
+        if self.profile.tokens_per_second:
+            time.sleep(completion_tokens / self.profile.tokens_per_second)
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }, {'x-ratelimit-remaining-requests': '1000', 'x-ratelimit-remaining-tokens': '1000000'})
+
+    def _stream(self, completion_id: str, model: str, content: str) -> None:
+        """Send the completion as server-sent events, four characters per token"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send_event(payload: str) -> None:
+            data = f"data: {payload}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        per_token = 1.0 / self.profile.tokens_per_second if self.profile.tokens_per_second else 0.0
+        for start in range(0, len(content), 16):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': content[start:start + 16]}, 'finish_reason': None}],
+            }
+            send_event(json.dumps(chunk))
+            if per_token:
+                time.sleep(per_token * 4)
+        send_event('[DONE]')
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+class _AssemblyAIHandler(_MockHandler):
+    def do_POST(self):
+        self._count()
+        body = self._read_body()
+        self.profile.delay()
+        if self._maybe_fail():
+            return
+
+        if self.path.rstrip('/') == '/v2/upload':
+            upload_id = uuid.uuid4().hex
+            with self.server.lock:
+                self.server.counters['upload_bytes'] += len(body)
+            self._send_json(200, {'upload_url': f"https://mock.assemblyai.local/upload/{upload_id}"})
+        elif self.path.rstrip('/') == '/v2/transcript':
+            request = json.loads(body or b'{}')
+            transcript_id = uuid.uuid4().hex
+            with self.server.lock:
+                self.server.jobs[transcript_id] = {'created': time.monotonic(), 'request': request}
+            self._send_json(200, self._transcript_payload(transcript_id))
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_GET(self):
+        self._count()
+        self.profile.delay()
+        if self._maybe_fail():
+            return
+
+        match = re.fullmatch(r'/v2/transcript/([0-9a-f]+)', self.path.rstrip('/'))
+        if not match or match.group(1) not in self.server.jobs:
+            self._send_json(404, {'error': 'Transcript not found'})
+            return
+        self._send_json(200, self._transcript_payload(match.group(1)))
+
+    def _transcript_payload(self, transcript_id: str) -> Dict[str, Any]:
+        job = self.server.jobs[transcript_id]
+        request = job['request']
+        elapsed = time.monotonic() - job['created']
+        done = elapsed >= self.profile.transcription_seconds
+        payload = dict(request)
+        payload.update({
+            'id': transcript_id,
+            'audio_url': request.get('audio_url', ''),
+            'status': 'completed' if done else ('processing' if elapsed > 0.1 else 'queued'),
+            'text': None,
+            'words': None,
+        })
+        if done:
+            text, words = mock_transcript(self.profile.transcript_words)
+            payload.update({'text': text, 'words': words, 'audio_duration': words[-1]['end'] // 1000})
+        return payload
+
+class MockServer:
+    """
+    A mock API server running on a background thread
+
+    Args:
+        handler: Request handler class
+        profile: Behaviour profile
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+    """
+
+    def __init__(self, handler, profile: Optional[MockProfile] = None, host: str = '127.0.0.1', port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.profile = profile or MockProfile()
+        self.httpd.lock = threading.Lock()
+        self.httpd.counters = {'requests': 0, 'errors': 0, 'upload_bytes': 0}
+        self.httpd.jobs = {}
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        with self.httpd.lock:
+            return dict(self.httpd.counters)
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def start_mock_groq(profile: Optional[MockProfile] = None, port: int = 0) -> MockServer:
+    """Start a mock Groq chat-completions server"""
+    return MockServer(_GroqHandler, profile, port=port).start()
+
+def start_mock_assemblyai(profile: Optional[MockProfile] = None, port: int = 0) -> MockServer:
+    """Start a mock AssemblyAI upload/transcript server"""
+    return MockServer(_AssemblyAIHandler, profile, port=port).start()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run mock Groq and AssemblyAI servers")
+    parser.add_argument('--groq-port', type=int, default=8701)
+    parser.add_argument('--assemblyai-port', type=int, default=8702)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--tokens-per-second', type=float, default=0.0)
+    parser.add_argument('--transcription-seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    profile = MockProfile(latency_ms=args.latency_ms, error_rate=args.error_rate,
+                          tokens_per_second=args.tokens_per_second,
+                          transcription_seconds=args.transcription_seconds)
+    groq_server = start_mock_groq(profile, args.groq_port)
+    aai_server = start_mock_assemblyai(profile, args.assemblyai_port)
+    print(f"GROQ_BASE_URL={groq_server.base_url}")
+    print(f"ASSEMBLYAI_BASE_URL={aai_server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        groq_server.stop()
+        aai_server.stop()
@@ -0,0 +1,125 @@
+"""
+Compact n-gram counting
+N-grams of token ids are packed into single integers instead of tuples
+or joined strings, and can be counted exactly or, for very long inputs,
+with lossy counting (Manku & Motwani), which keeps memory bounded by
+dropping rare entries while guaranteeing that no count is underestimated
+by more than epsilon times the number of n-grams seen.
+"""
+
+import math
+from collections import Counter
+from typing import Optional, List, Tuple, Dict, Iterable, Union
+
+ID_BITS = 20  # Bits per token id; vocabularies up to about a million words
+ID_MASK = (1 << ID_BITS) - 1
+MAX_NGRAM = 3  # The length is stored in the low two bits
+DEFAULT_EPSILON = 1e-4
+
+def pack_ngram(token_ids: Iterable[int]) -> int:
+    """
+    Pack up to MAX_NGRAM token ids into one integer
+
+    Raises:
+        ValueError if there are too many ids or an id does not fit ID_BITS
+    """
+    key = 0
+    length = 0
+    for token_id in token_ids:
+        if token_id > ID_MASK:
+            raise ValueError(f"Token id {token_id} does not fit in {ID_BITS} bits")
+        key |= token_id << (ID_BITS * length)
+        length += 1
+    if not 0 < length <= MAX_NGRAM:
+        raise ValueError(f"N-grams must have 1 to {MAX_NGRAM} tokens, got {length}")
+    return key << 2 | length
+
+def unpack_ngram(key: int) -> Tuple[int, ...]:
+    """Token ids of a key made by pack_ngram"""
+    length = key & 3
+    key >>= 2
+    return tuple((key >> (ID_BITS * i)) & ID_MASK for i in range(length))
+
+class LossyCounter:
+    """
+    Approximate counter with bounded memory (lossy counting)
+
+    The stream is split into buckets of 1/epsilon items; at the end of each
+    bucket, entries whose count could not exceed the bucket number are
+    dropped. Any item occurring more than epsilon * total times is kept,
+    and its count is low by at most epsilon * total. About
+    (1/epsilon) * log(epsilon * total) entries are held at any time.
+
+    Args:
+        epsilon: Maximum error as a fraction of the number of items counted
+    """
+
+    def __init__(self, epsilon: float = DEFAULT_EPSILON):
+        if not 0 < epsilon < 1:
+            raise ValueError("epsilon must be between 0 and 1")
+        self.epsilon = epsilon
+        self.width = math.ceil(1 / epsilon)
+        self.total = 0
+        self.bucket = 1
+        self.counts: Dict[int, int] = {}
+        self._errors: Dict[int, int] = {}  # Largest count an entry may have lost before it was added
+
+    def update(self, keys: Iterable[int]) -> None:
+        """Count every key from an iterable"""
+        counts = self.counts
+        errors = self._errors
+        width = self.width
+        remaining = width - self.total % width  # Items left in the current bucket
+        for key in keys:
+            count = counts.get(key)
+            if count is None:
+                counts[key] = 1
+                errors[key] = self.bucket - 1
+            else:
+                counts[key] = count + 1
+            self.total += 1
+            remaining -= 1
+            if not remaining:
+                self._prune()
+                self.bucket += 1
+                remaining = width
+
+    def add(self, key: int) -> None:
+        """Count one key"""
+        self.update((key,))
+
+    def _prune(self) -> None:
+        counts = self.counts
+        errors = self._errors
+        bucket = self.bucket
+        for key in [key for key, count in counts.items() if count + errors[key] <= bucket]:
+            del counts[key]
+            del errors[key]
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __getitem__(self, key: int) -> int:
+        return self.counts.get(key, 0)
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(key, count) pairs, highest count first, like Counter.most_common"""
+        items = sorted(self.counts.items(), key=lambda item: -item[1])
+        return items if n is None else items[:n]
+
+def count_ngrams(keys: Iterable[int], epsilon: Optional[float] = None) -> Union[Counter, LossyCounter]:
+    """
+    Count packed n-grams from an iterable (typically a generator)
+
+    Args:
+        keys: Keys made by pack_ngram
+        epsilon: None for exact counts; otherwise the LossyCounter error bound
+
+    Returns:
+        Counter or LossyCounter, both supporting most_common and [key]
+    """
+    if epsilon is None:
+        return Counter(keys)
+    counter = LossyCounter(epsilon)
+    counter.update(keys)
+    return counter
@@ -0,0 +1,94 @@
+"""
+Pipeline stage execution
+Runs independent processing stages (e.g. keyword extraction and note
+generation, which both only need the transcript) at the same time
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+
+def run_concurrent_stages(
+    stages: Dict[str, Callable[..., Any]],
+    on_stage_complete: Optional[Callable[[str, Any, Optional[BaseException]], None]] = None,
+    max_workers: Optional[int] = None,
+    foreground_stage: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run independent stages in a thread pool and wait for all of them
+
+    The stages run on worker threads, but on_stage_complete is always
+    called from the calling thread as each stage finishes, so it is safe
+    to update Streamlit elements from it. A stage that has to draw to the
+    page while it runs (e.g. streaming output) can be named as the
+    foreground stage; it runs on the calling thread while the others run
+    in the background. It is called with one argument, a function that
+    reports background stages finished so far through on_stage_complete;
+    call it regularly (e.g. between stream chunks) so their progress shows
+    while the foreground stage is still running.
+
+    Args:
+        stages: Mapping of stage name to a zero-argument callable (the
+            foreground stage takes the reporting function)
+        on_stage_complete: Called with (name, result, error) as each stage finishes
+        max_workers: Maximum number of threads (defaults to one per stage)
+        foreground_stage: Name of a stage to run on the calling thread
+
+    Returns:
+        Dictionary with stage names as keys and their results as values
+
+    Raises:
+        The first stage exception, once every stage has finished
+    """
+    results = {}
+    errors = []
+
+    if not stages:
+        return results
+
+    background = {name: func for name, func in stages.items() if name != foreground_stage}
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(background))) as executor:
+        futures = {executor.submit(func): name for name, func in background.items()}
+        pending = set(futures)
+
+        def report(done):
+            for future in done:
+                name = futures[future]
+                error = future.exception()
+                result = None if error else future.result()
+
+                if error is None:
+                    results[name] = result
+                else:
+                    errors.append(error)
+
+                if on_stage_complete:
+                    on_stage_complete(name, result, error)
+
+        def report_finished():
+            done = {future for future in pending if future.done()}
+            pending.difference_update(done)
+            report(done)
+
+        if foreground_stage in stages:
+            result = None
+            error = None
+            try:
+                result = stages[foreground_stage](report_finished)
+                results[foreground_stage] = result
+            except Exception as e:
+                error = e
+                errors.append(e)
+
+            if on_stage_complete:
+                on_stage_complete(foreground_stage, result, error)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+            report(done)
+
+    if errors:
+        raise errors[0]
+
+    return results
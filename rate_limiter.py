@@ -0,0 +1,282 @@
+"""
+Rate-limit-aware request scheduling
+Every Groq and AssemblyAI call goes through a per-provider scheduler that
+keeps request and token rates under the provider's limits, retries only
+errors that can succeed on a second try, and honours Retry-After
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Defaults per provider; override with LECTUREAI_<PROVIDER>_RPM / _TPM (0 disables a limit)
+DEFAULT_LIMITS = {
+    'groq': {'requests_per_minute': 30, 'tokens_per_minute': 0},
+    'assemblyai': {'requests_per_minute': 60, 'tokens_per_minute': 0},
+}
+
+class RetryableError(Exception):
+    """An error raised by our own checks (e.g. an empty response) that is worth retrying"""
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute
+
+    reserve() hands out capacity in arrival order and may put the bucket
+    into debt, so concurrent callers queue up behind each other instead of
+    all waking up at once when capacity returns.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount from the bucket
+
+        Args:
+            amount: Units to take (requests or tokens)
+
+        Returns:
+            Seconds the caller has to wait before using the reservation
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._available -= amount
+            if self._available >= 0:
+                return 0.0
+            return -self._available / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Return unused units, e.g. when a response used fewer tokens than reserved"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._available = min(self.capacity, self._available + amount)
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether a failed request may succeed if retried
+
+    Rate limits, timeouts, connection failures and 5xx responses are
+    retryable; authentication, validation and other client errors are not.
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        True if the request should be retried
+    """
+    if isinstance(error, RetryableError):
+        return True
+
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        response = getattr(error, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+    if isinstance(status_code, int):
+        return status_code in RETRYABLE_STATUS_CODES
+
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+
+    # Groq's connection/timeout errors carry no status code
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Read the server's requested wait from a failed response
+
+    Supports retry-after-ms, and Retry-After as seconds or an HTTP date.
+
+    Returns:
+        Seconds to wait, or None if the response did not say
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RequestScheduler:
+    """
+    Paces and retries requests to one provider
+
+    Args:
+        provider: Provider name, used in log messages
+        requests_per_minute: Request limit (0 disables it)
+        tokens_per_minute: Token limit (0 disables it)
+        base_delay: First back-off delay in seconds
+        max_delay: Upper bound for a single back-off delay
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Block until a request using the given number of tokens may be sent
+
+        Args:
+            tokens: Estimated tokens the request will consume
+        """
+        with self._lock:
+            wait = self._paused_until - time.monotonic()
+        wait = max(wait, 0.0)
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+
+    def settle(self, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """Give back tokens that were reserved but not used"""
+        if self.tokens and used_tokens is not None and used_tokens < reserved_tokens:
+            self.tokens.refund(reserved_tokens - used_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request to this provider for the given time (e.g. after a 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def retry_delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """
+        How long to wait before retrying after a failure
+
+        Args:
+            error: Exception raised by the failed attempt
+            attempt: Zero-based number of the failed attempt
+
+        Returns:
+            Seconds to wait, or None if the error should not be retried
+        """
+        if not is_retryable(error):
+            return None
+
+        server_delay = retry_after_seconds(error)
+        if server_delay is not None:
+            # The provider told everyone to back off, not just this request
+            self.pause(server_delay)
+            return min(server_delay, self.max_delay)
+
+        # Full jitter exponential backoff
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(
+        self,
+        func: Callable[[], Any],
+        tokens: int = 0,
+        max_retries: int = 3,
+        label: str = "Request",
+        used_tokens: Optional[Callable[[Any], Optional[int]]] = None
+    ) -> Any:
+        """
+        Run a request under the rate limits, retrying retryable failures
+
+        Args:
+            func: Zero-argument callable performing the request
+            tokens: Estimated tokens the request will consume
+            max_retries: Maximum number of attempts
+            label: Name used in log and error messages
+            used_tokens: Optional callable returning the actual token usage from the result
+
+        Returns:
+            The result of func
+
+        Raises:
+            Exception describing the last failure
+        """
+        for attempt in range(max_retries):
+            self.acquire(tokens)
+            try:
+                result = func()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt)
+                if delay is None:
+                    raise Exception(f"{label} failed: {str(e)}") from e
+                if attempt < max_retries - 1:
+                    print(f"{label} attempt {attempt + 1} failed: {str(e)}. Retrying in {delay:.1f}s...")
+                    time.sleep(delay)
+                else:
+                    raise Exception(f"{label} failed after {max_retries} attempts: {str(e)}") from e
+            else:
+                if used_tokens:
+                    self.settle(tokens, used_tokens(result))
+                return result
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(provider: str) -> RequestScheduler:
+    """
+    Return the process-wide scheduler for a provider
+
+    Limits come from LECTUREAI_<PROVIDER>_RPM and LECTUREAI_<PROVIDER>_TPM,
+    falling back to DEFAULT_LIMITS.
+
+    Args:
+        provider: 'groq' or 'assemblyai'
+
+    Returns:
+        Shared RequestScheduler
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(provider)
+        if scheduler is None:
+            defaults = DEFAULT_LIMITS.get(provider, {'requests_per_minute': 0, 'tokens_per_minute': 0})
+            prefix = f"LECTUREAI_{provider.upper()}"
+            scheduler = RequestScheduler(
+                provider,
+                requests_per_minute=float(os.getenv(f"{prefix}_RPM", defaults['requests_per_minute'])),
+                tokens_per_minute=float(os.getenv(f"{prefix}_TPM", defaults['tokens_per_minute'])),
+            )
+            _schedulers[provider] = scheduler
+        return scheduler
@@ -0,0 +1,275 @@
+"""
+Groq response cache
+Memoizes chat completions keyed by model, a hash of the messages and the
+sampling parameters, so identical requests on reruns and repeated button
+presses are answered locally. Backends: in-memory LRU or SQLite on disk.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # One week
+DEFAULT_SQLITE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "lectureai", "responses.sqlite3")
+
+def make_request_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: Optional[float] = None,
+    top_p: Optional[float] = None,
+    max_tokens: Optional[int] = None
+) -> str:
+    """
+    Cache key for a chat completion request
+
+    Args:
+        model: Model name
+        messages: Chat messages
+        temperature: Sampling temperature
+        top_p: Nucleus sampling parameter
+        max_tokens: Completion token limit
+
+    Returns:
+        Hex digest identifying the request
+    """
+    messages_hash = hashlib.sha256(
+        json.dumps(messages, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+    params = json.dumps([model, messages_hash, temperature, top_p, max_tokens])
+    return hashlib.sha256(params.encode('utf-8')).hexdigest()
+
+class MemoryBackend:
+    """
+    In-process LRU backend with TTL
+
+    Args:
+        max_entries: Maximum number of cached responses
+        ttl: Seconds a response stays valid (0 keeps it until evicted)
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+class SQLiteBackend:
+    """
+    On-disk backend in a single SQLite file, shared across processes
+
+    Least recently used rows are deleted once max_entries is exceeded.
+
+    Args:
+        path: Database file
+        max_entries: Maximum number of cached responses
+        ttl: Seconds a response stays valid (0 keeps it until evicted)
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL_SECONDS):
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            if self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+class ResponseCache:
+    """
+    Chat completion cache with hit/miss accounting
+
+    Each entry remembers the tokens and seconds the original request cost,
+    so stats() can report what the hits saved.
+
+    Args:
+        backend: MemoryBackend or SQLiteBackend
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached completion
+
+        Args:
+            key: Key from make_request_key
+
+        Returns:
+            The completion text or None on a miss
+        """
+        try:
+            entry = self.backend.get(key)
+        except sqlite3.Error as e:
+            print(f"Error reading response cache: {str(e)}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_tokens += entry.get('tokens') or 0
+            self.saved_seconds += entry.get('seconds') or 0.0
+        return entry['content']
+
+    def put(self, key: str, content: str, tokens: Optional[int] = None, seconds: Optional[float] = None) -> None:
+        """
+        Store a completion
+
+        Args:
+            key: Key from make_request_key
+            content: Completion text
+            tokens: Tokens the request consumed
+            seconds: Time the request took
+        """
+        try:
+            self.backend.set(key, {'content': content, 'tokens': tokens, 'seconds': seconds})
+        except sqlite3.Error as e:
+            # A failed cache write must never fail the request itself
+            print(f"Error writing response cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache effectiveness
+
+        Returns:
+            Dictionary with hits, misses, hit_rate, entries, saved_tokens and saved_seconds
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'saved_tokens': self.saved_tokens,
+                'saved_seconds': self.saved_seconds,
+            }
+        stats['entries'] = len(self.backend)
+        return stats
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_configured = False
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the process-wide response cache, or None if caching is off
+
+    Configured with LECTUREAI_RESPONSE_CACHE (memory, sqlite or off;
+    default memory), LECTUREAI_RESPONSE_CACHE_PATH,
+    LECTUREAI_RESPONSE_CACHE_TTL (seconds) and
+    LECTUREAI_RESPONSE_CACHE_MAX_ENTRIES.
+    """
+    global _response_cache, _response_cache_configured
+    with _response_cache_lock:
+        if not _response_cache_configured:
+            kind = os.getenv("LECTUREAI_RESPONSE_CACHE", "memory").lower()
+            ttl = float(os.getenv("LECTUREAI_RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS))
+            max_entries = int(os.getenv("LECTUREAI_RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+            if kind == "sqlite":
+                path = os.getenv("LECTUREAI_RESPONSE_CACHE_PATH", DEFAULT_SQLITE_PATH)
+                _response_cache = ResponseCache(SQLiteBackend(path, max_entries, ttl))
+            elif kind == "memory":
+                _response_cache = ResponseCache(MemoryBackend(max_entries, ttl))
+            else:
+                _response_cache = None
+            _response_cache_configured = True
+        return _response_cache
+
+def configure_response_cache(backend=None) -> Optional[ResponseCache]:
+    """
+    Replace the process-wide response cache
+
+    Args:
+        backend: MemoryBackend, SQLiteBackend, or None to turn caching off
+
+    Returns:
+        The new cache (None if turned off)
+    """
+    global _response_cache, _response_cache_configured
+    with _response_cache_lock:
+        _response_cache = ResponseCache(backend) if backend is not None else None
+        _response_cache_configured = True
+        return _response_cache
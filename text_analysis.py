@@ -0,0 +1,224 @@
+"""
+Single-pass text tokenization
+Splits a transcript into words once and keeps the result in compact
+arrays (token ids, character offsets, sentence and clause boundaries) with
+an interned word table, so every keyword function can work on the same
+tokens instead of lowercasing and splitting the full text again. Numbers,
+statistics and technical terms are found by one scanner pass as well.
+"""
+
+import re
+from array import array
+from collections import Counter
+from typing import Optional, List, Tuple, Dict, Union
+
+# Words, with apostrophes and hyphens allowed inside them ("don't", "state-of-the-art")
+WORD_PATTERN = re.compile(r"\w+(?:['’\-]\w+)*")
+SENTENCE_END = re.compile(r'[.!?]')
+
+# One alternation for every kind of finding; the lookahead lets the regex
+# engine skip straight to digits and capitals. Earlier alternatives win, so
+# "3 million" is a magnitude, not a measurement of 3 m.
+SCANNER = re.compile(r"""
+    (?=[0-9A-Z])(?:
+        (?P<percentage>\d+(?:\.\d+)?\s*%)
+      | (?P<number>\d+(?:\.\d+)?\s+(?i:million|billion|thousand|hundred)\b)
+      | (?P<measurement>\d+(?:\.\d+)?\s*(?:kg|km|cm|ml|g|m|l|°C|°F)(?!\w))
+      | (?P<year>\b(?:19|20)\d{2}\b)
+      | (?P<acronym>\b[A-Z]{2,}\b)
+      | (?P<capitalized>(?<!^)(?<![.!?]\s)\b[A-Z][a-z]+\b)  # Not at the start of a sentence
+    )
+""", re.VERBOSE)
+FINDING_KINDS = tuple(SCANNER.groupindex)
+
+Finding = Tuple[str, str, int, int]  # (kind, text, start, end)
+
+def scan_text(text: str) -> List[Finding]:
+    """
+    Find percentages, magnitudes, measurements, years, acronyms and
+    capitalized terms in one pass
+
+    Args:
+        text: Input text
+
+    Returns:
+        (kind, text, start, end) for every finding, in text order; kind is
+        one of FINDING_KINDS
+    """
+    return [(match.lastgroup, match.group(), match.start(), match.end()) for match in SCANNER.finditer(text)]
+
+class TextAnalysis:
+    """
+    Tokens of a text with their positions
+
+    Each token has a normalized (lowercase) id and a surface id for its
+    original spelling; both refer to interned word tables. starts/ends are
+    character offsets into the original text. sentence_starts and
+    clause_starts hold the token positions where a sentence (after . ! ?)
+    or a clause (after any punctuation) begins; every sentence start is
+    also a clause start.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.vocab: List[str] = []
+        self.surfaces: List[str] = []
+        self.token_ids = array('I')
+        self.surface_ids = array('I')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.sentence_starts = array('I')
+        self.clause_starts = array('I')
+        self._vocab_ids: Dict[str, int] = {}
+        self._lower: Optional[str] = None
+        self._counts: Optional[Counter] = None
+        self._findings: Optional[List[Finding]] = None
+        self._postings: Optional[array] = None  # Token positions grouped by token id
+        self._posting_starts: Optional[array] = None  # Where each token id's positions begin
+        self._tokenize()
+
+    def _tokenize(self) -> None:
+        text = self.text
+        surface_lookup: Dict[str, int] = {}
+        normalized_of = []  # Surface id -> token id
+        previous_end = 0
+
+        for position, match in enumerate(WORD_PATTERN.finditer(text)):
+            start, end = match.span()
+            surface = match.group()
+
+            surface_id = surface_lookup.get(surface)
+            if surface_id is None:
+                surface_id = surface_lookup[surface] = len(self.surfaces)
+                self.surfaces.append(surface)
+                lower = surface.lower()
+                token_id = self._vocab_ids.get(lower)
+                if token_id is None:
+                    token_id = self._vocab_ids[lower] = len(self.vocab)
+                    self.vocab.append(lower)
+                normalized_of.append(token_id)
+
+            # Whatever separates this word from the previous one decides the boundaries
+            gap = text[previous_end:start]
+            if position == 0 or SENTENCE_END.search(gap):
+                self.sentence_starts.append(position)
+                self.clause_starts.append(position)
+            elif gap.strip():
+                self.clause_starts.append(position)
+
+            self.token_ids.append(normalized_of[surface_id])
+            self.surface_ids.append(surface_id)
+            self.starts.append(start)
+            self.ends.append(end)
+            previous_end = end
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    def word(self, position: int) -> str:
+        """Normalized word at a position"""
+        return self.vocab[self.token_ids[position]]
+
+    def surface(self, position: int) -> str:
+        """Word at a position as written in the text"""
+        return self.surfaces[self.surface_ids[position]]
+
+    def id_of(self, word: str) -> Optional[int]:
+        """Token id of a word, or None if it does not occur"""
+        return self._vocab_ids.get(word.lower())
+
+    @property
+    def words(self) -> List[str]:
+        """Every token in order, normalized"""
+        vocab = self.vocab
+        return [vocab[token_id] for token_id in self.token_ids]
+
+    @property
+    def lower(self) -> str:
+        """The lowercased text (computed once)"""
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def counts(self) -> Counter:
+        """Occurrences of each token id (computed once)"""
+        if self._counts is None:
+            self._counts = Counter(self.token_ids)
+        return self._counts
+
+    @property
+    def findings(self) -> List[Finding]:
+        """scan_text results for the text (computed once)"""
+        if self._findings is None:
+            self._findings = scan_text(self.text)
+        return self._findings
+
+    def _build_postings(self) -> None:
+        token_ids = self.token_ids
+        counts = self.counts
+        starts = array('I', [0])
+        for token_id in range(len(self.vocab)):
+            starts.append(starts[-1] + counts[token_id])
+        # A stable sort keeps each token id's positions in text order
+        self._postings = array('I', sorted(range(len(token_ids)), key=token_ids.__getitem__))
+        self._posting_starts = starts
+
+    def positions(self, token_id: int) -> array:
+        """
+        Positions of every occurrence of a token id, in text order
+
+        The positional index behind this is built on first use and shared
+        by every lookup afterwards.
+        """
+        if self._postings is None:
+            self._build_postings()
+        return self._postings[self._posting_starts[token_id]:self._posting_starts[token_id + 1]]
+
+    def phrase_positions(self, words: List[str]) -> List[int]:
+        """
+        Positions where a sequence of words starts
+
+        Args:
+            words: Normalized words, e.g. ['gradient', 'descent']
+
+        Returns:
+            Token positions in text order
+        """
+        ids = [self._vocab_ids.get(word) for word in words]
+        if not ids or None in ids:
+            return []
+        token_ids = self.token_ids
+        length = len(ids)
+        return [position for position in self.positions(ids[0])
+                if token_ids[position:position + length].tolist() == ids]
+
+    def _spans(self, starts: array) -> List[Tuple[int, int]]:
+        bounds = list(starts) + [len(self.token_ids)]
+        return [(first, last) for first, last in zip(bounds, bounds[1:]) if last > first]
+
+    def sentence_spans(self) -> List[Tuple[int, int]]:
+        """(first, last) token positions of every sentence, last exclusive"""
+        return self._spans(self.sentence_starts)
+
+    def clause_spans(self) -> List[Tuple[int, int]]:
+        """(first, last) token positions of every clause, last exclusive"""
+        return self._spans(self.clause_starts)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the arrays and the word tables"""
+        arrays = [self.token_ids, self.surface_ids, self.starts, self.ends, self.sentence_starts, self.clause_starts]
+        if self._postings is not None:
+            arrays += [self._postings, self._posting_starts]
+        return (sum(a.itemsize * len(a) for a in arrays) +
+                sum(len(word) for word in self.vocab) + sum(len(word) for word in self.surfaces))
+
+def analyze(text: Union[str, TextAnalysis]) -> TextAnalysis:
+    """
+    Tokenize a text, or return it unchanged if it already is a TextAnalysis
+
+    Build one TextAnalysis per transcript and pass it to every keyword_utils
+    function to tokenize only once.
+    """
+    return text if isinstance(text, TextAnalysis) else TextAnalysis(text)
@@ -0,0 +1,195 @@
+"""
+Token budgeting for LLM prompts
+Estimates token counts locally and packs as much transcript as fits into a
+model's context window, alongside the prompt and the completion budget
+"""
+
+import os
+import re
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Tuple
+
+# Context window (prompt + completion) per model
+MODEL_CONTEXT_TOKENS = {
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+# Inserted text per request, however large the window: long transcripts go
+# through the parallel chunked path and requests stay under per-minute quotas
+MAX_TEXT_TOKENS = 12000
+SAFETY_MARGIN = 0.9  # Keep 10% headroom for estimation error and chat formatting
+MESSAGE_OVERHEAD_TOKENS = 8  # Role markers etc. per message
+
+# A sentence ends at ., ! or ? followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Words, runs of up to three digits, or single symbols
+_PIECE_PATTERN = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]|_")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many tokens a Llama-style BPE tokenizer produces for text
+
+    Short common words are usually a single token; longer words are split
+    into roughly four-character pieces. Numbers are split into groups of up
+    to three digits and every symbol counts as one token.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Estimated token count
+    """
+    tokens = 0
+    for match in _PIECE_PATTERN.finditer(text):
+        length = match.end() - match.start()
+        tokens += 1 + (length - 5) // 4 if length > 6 else 1
+    return tokens
+
+@lru_cache(maxsize=32)
+def _text_profile(text: str) -> Tuple[array, array]:
+    """
+    Sentence end offsets and cumulative token counts for a text
+
+    Cached per text, so packing the same transcript for several prompts
+    only tokenizes it once.
+    """
+    ends = array('L')
+    cumulative = array('L')
+    total = 0
+    start = 0
+
+    for boundary in [m.end() for m in SENTENCE_BOUNDARY.finditer(text)] + [len(text)]:
+        if boundary <= start:
+            continue
+        total += estimate_tokens(text[start:boundary])
+        ends.append(boundary)
+        cumulative.append(total)
+        start = boundary
+
+    return ends, cumulative
+
+def count_tokens(text: str) -> int:
+    """
+    Estimated token count of a (long) text, cached per text
+
+    Args:
+        text: Input text
+
+    Returns:
+        Estimated token count
+    """
+    _, cumulative = _text_profile(text)
+    return cumulative[-1] if cumulative else 0
+
+def context_window(model: str) -> int:
+    """
+    Usable context window for a model
+
+    LECTUREAI_MAX_PROMPT_TOKENS caps it, e.g. to stay under a low
+    tokens-per-minute quota.
+    """
+    window = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    cap = os.getenv("LECTUREAI_MAX_PROMPT_TOKENS")
+    return min(window, int(cap)) if cap else window
+
+def text_token_cap() -> int:
+    """Per-request cap on inserted text (LECTUREAI_MAX_TEXT_TOKENS overrides MAX_TEXT_TOKENS)"""
+    return int(os.getenv("LECTUREAI_MAX_TEXT_TOKENS", MAX_TEXT_TOKENS))
+
+def prompt_budget(model: str, prompt_parts: List[str], max_tokens: int) -> int:
+    """
+    Tokens left for the text to be inserted into a prompt, at most
+    text_token_cap()
+
+    Args:
+        model: Model name
+        prompt_parts: Every fixed message text (system prompt, user prompt template)
+        max_tokens: Completion tokens reserved for the response
+
+    Returns:
+        Token budget for the inserted text (at least 1)
+    """
+    fixed = sum(estimate_tokens(part) + MESSAGE_OVERHEAD_TOKENS for part in prompt_parts)
+    available = int(context_window(model) * SAFETY_MARGIN) - fixed - max_tokens
+    return max(1, min(available, text_token_cap()))
+
+def _fit_words(text: str, budget: int) -> int:
+    """Offset of the longest word-aligned prefix of text within budget"""
+    used = 0
+    end = 0
+    for match in re.finditer(r'\S+\s*', text):
+        used += estimate_tokens(match.group())
+        if used > budget:
+            break
+        end = match.end()
+    return end
+
+def pack_text(text: str, budget: int) -> str:
+    """
+    Largest prefix of text that fits the token budget
+
+    The cut is made at a sentence boundary, or at a word boundary when not
+    even the first sentence fits.
+
+    Args:
+        text: Input text
+        budget: Token budget from prompt_budget
+
+    Returns:
+        The whole text if it fits, otherwise the longest fitting prefix
+    """
+    ends, cumulative = _text_profile(text)
+    if not cumulative or cumulative[-1] <= budget:
+        return text
+
+    count = bisect_right(cumulative, budget)
+    if count:
+        return text[:ends[count - 1]].rstrip()
+    return text[:_fit_words(text, budget)].rstrip()
+
+def chunk_by_tokens(text: str, budget: int) -> List[str]:
+    """
+    Split text into consecutive chunks of whole sentences within the token budget
+
+    A sentence that exceeds the budget on its own is split on words.
+
+    Args:
+        text: Input text
+        budget: Token budget per chunk
+
+    Returns:
+        List of chunks in original order
+    """
+    ends, cumulative = _text_profile(text)
+    chunks = []
+    start = 0
+    used = 0  # Cumulative count at the end of the last chunk
+    index = 0
+
+    while index < len(ends):
+        if cumulative[index] - used > budget:
+            # The next sentence alone is too long; cut it on words
+            remainder = text[start:ends[index]]
+            while remainder.strip() and estimate_tokens(remainder) > budget:
+                remainder = remainder.lstrip()
+                cut = _fit_words(remainder, budget) or len(remainder.split(None, 1)[0]) + 1
+                chunks.append(remainder[:cut].strip())
+                remainder = remainder[cut:]
+            if remainder.strip():
+                chunks.append(remainder.strip())
+            start = ends[index]
+            used = cumulative[index]
+            index += 1
+            continue
+
+        last = bisect_right(cumulative, used + budget, lo=index) - 1
+        chunks.append(text[start:ends[last]].strip())
+        start = ends[last]
+        used = cumulative[last]
+        index = last + 1
+
+    return [chunk for chunk in chunks if chunk]
@@ -0,0 +1,224 @@
+"""
+Persistent transcript cache
+Finished transcripts are stored on disk, keyed by a hash of the audio bytes
+and the transcription settings, so re-uploading the same lecture skips
+AssemblyAI entirely
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Optional, Dict, Any
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "lectureai", "transcripts")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+HASH_CHUNK_SIZE = 1024 * 1024  # Read audio 1 MB at a time
+
+def hash_audio_file(audio_path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    Compute a SHA-256 digest of an audio file without loading it into memory
+
+    Args:
+        audio_path: Path to the audio file
+        chunk_size: Number of bytes read per iteration
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(audio_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def make_cache_key(audio_hash: str, settings: Dict[str, Any]) -> str:
+    """
+    Combine the audio digest with the transcription settings
+
+    Args:
+        audio_hash: Digest returned by hash_audio_file
+        settings: Keyword arguments used to build the TranscriptionConfig
+
+    Returns:
+        Cache key (hex digest)
+    """
+    settings_blob = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(f"{audio_hash}:{settings_blob}".encode('utf-8')).hexdigest()
+
+class TranscriptCache:
+    """
+    Size-bounded on-disk cache of transcripts with LRU eviction
+
+    Each entry is a JSON file named after its key, optionally with a
+    binary word index next to it. A file's modification time doubles as
+    the last-access time, so recency survives restarts without a separate
+    index.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _words_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.words")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached entry and mark it as recently used
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            The stored entry or None on a miss
+        """
+        path = self._entry_path(key)
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                os.utime(path, None)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        Store an entry, then evict least recently used entries over the size limit
+
+        Args:
+            key: Cache key from make_cache_key
+            entry: JSON-serialisable data (at least a 'text' field)
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, path)
+                self._evict()
+            except OSError as e:
+                # A failed cache write must never fail the transcription itself
+                print(f"Error writing transcript cache: {str(e)}")
+
+    def get_words(self, key: str) -> Optional[bytes]:
+        """
+        Look up the serialized word index stored with an entry
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Bytes written by put_words, or None if there are none
+        """
+        path = self._words_path(key)
+        with self._lock:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path, None)
+            except OSError:
+                return None
+            return data
+
+    def put_words(self, key: str, data: bytes) -> None:
+        """
+        Store a serialized word index next to an entry
+
+        Args:
+            key: Cache key from make_cache_key
+            data: Bytes from WordIndex.to_bytes
+        """
+        path = self._words_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self._evict()
+            except OSError as e:
+                print(f"Error writing transcript cache: {str(e)}")
+
+    def _entries(self) -> list:
+        """Return (mtime, size, path) for every entry and word index, oldest first"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(('.json', '.words')):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache effectiveness
+
+        Returns:
+            Dictionary with hits, misses, hit_rate, entries and bytes
+        """
+        with self._lock:
+            entries = self._entries()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': sum(1 for _, _, path in entries if path.endswith('.json')),
+                'bytes': sum(size for _, size, _ in entries),
+            }
+
+_default_cache: Optional[TranscriptCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Return the process-wide transcript cache
+
+    The location and size limit can be overridden with the
+    LECTUREAI_CACHE_DIR and LECTUREAI_CACHE_MAX_MB environment variables.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_mb = os.getenv("LECTUREAI_CACHE_MAX_MB")
+            max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+            _default_cache = TranscriptCache(os.getenv("LECTUREAI_CACHE_DIR"), max_bytes)
+        return _default_cache
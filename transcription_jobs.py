@@ -0,0 +1,372 @@
+"""
+Non-blocking transcription jobs
+Audio is uploaded and submitted to AssemblyAI by a small worker pool, and
+a single background poller checks every outstanding transcript, so one
+process can keep dozens of transcriptions in flight without a blocked
+thread per job. Jobs are looked up by id, which lets the Streamlit UI
+reattach to a running transcription across reruns and page reloads.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any
+
+import assemblyai as aai
+
+from api_models import (get_api_key, TRANSCRIPTION_SETTINGS, plan_transcription_segments, stitch_segments,
+                        word_dicts, cached_word_index)
+from audio_preprocess import preprocess_audio, format_savings, split_audio
+from clients import get_transcriber, get_assemblyai_client
+from metrics import span, get_metrics
+from rate_limiter import get_scheduler
+from transcript_cache import get_transcript_cache, hash_audio_file, make_cache_key
+from word_index import WordIndex
+
+SUBMIT_WORKERS = 4  # Uploads running at the same time
+MIN_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 15.0
+POLL_INTERVAL_FRACTION = 0.1  # Poll after 10% of the time the job has been running
+JOB_RETENTION_SECONDS = 3600  # Finished jobs stay available for reattaching this long
+
+PENDING_STATUSES = ('preparing', 'queued', 'processing')
+
+class TranscriptionJob:
+    """
+    State of one transcription
+
+    status moves from 'preparing' (preprocessing and upload) to 'queued'
+    and 'processing' (AssemblyAI is working) and ends as 'completed' or
+    'error'. A long recording is submitted as several segments, which
+    complete independently and are stitched when the last one finishes.
+    """
+
+    def __init__(self, audio_path: str):
+        self.id = uuid.uuid4().hex
+        self.audio_path = audio_path
+        self.status = 'preparing'
+        self.text: Optional[str] = None
+        self.words: Optional[WordIndex] = None
+        self.error: Optional[str] = None
+        self.transcript_ids: List[str] = []
+        self.created = time.time()
+        self.submitted: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.polls = 0
+        self._segments: Optional[List[Dict[str, float]]] = None
+        self._offset_seconds = 0.0
+        self._results: Dict[str, Any] = {}
+        self._pending: Dict[str, float] = {}  # transcript id -> next poll (monotonic)
+        self._api_key: Optional[str] = None
+        self._cache_key: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status not in PENDING_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot for display or JSON"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'text': self.text,
+            'error': self.error,
+            'transcript_ids': list(self.transcript_ids),
+            'segments': len(self._segments) if self._segments else 1,
+            'segments_done': len(self._results),
+            'created': self.created,
+            'submitted': self.submitted,
+            'finished': self.finished,
+            'polls': self.polls,
+        }
+
+class JobManager:
+    """
+    Submits transcription jobs and polls them from one background thread
+
+    Args:
+        submit_workers: Uploads running at the same time
+        min_poll_interval: Shortest wait between two polls of a transcript
+        max_poll_interval: Longest wait between two polls of a transcript
+        retention: Seconds finished jobs are kept
+    """
+
+    def __init__(
+        self,
+        submit_workers: int = SUBMIT_WORKERS,
+        min_poll_interval: float = MIN_POLL_INTERVAL,
+        max_poll_interval: float = MAX_POLL_INTERVAL,
+        retention: float = JOB_RETENTION_SECONDS
+    ):
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.retention = retention
+        self._jobs: Dict[str, TranscriptionJob] = {}
+        self._executor = ThreadPoolExecutor(max_workers=submit_workers, thread_name_prefix="transcription-submit")
+        self._condition = threading.Condition()
+        self._poller: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, audio_path: str, use_cache: bool = True, preprocess: bool = True,
+               segmented: Optional[bool] = None, delete_audio: bool = False) -> str:
+        """
+        Start transcribing a recording and return immediately
+
+        Args:
+            audio_path: Path to the audio file
+            use_cache: Reuse a stored transcript when the same audio was transcribed before
+            preprocess: Shrink the audio with ffmpeg before upload
+            segmented: True to always split, False to never split, None to split long recordings
+            delete_audio: Delete audio_path once it has been uploaded (for temp files)
+
+        Returns:
+            Job id for get() and wait()
+        """
+        job = TranscriptionJob(audio_path)
+        with self._condition:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._prepare, job, use_cache, preprocess, segmented, delete_audio)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[TranscriptionJob]:
+        """Look up a job (None if unknown or expired)"""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[TranscriptionJob]:
+        """
+        Block until a job has finished
+
+        Args:
+            job_id: Job id from submit()
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            The job, finished unless the timeout expired; None if unknown
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            job = self._jobs.get(job_id)
+            while job is not None and not job.done:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return job
+
+    def active(self) -> int:
+        """Number of jobs that have not finished yet"""
+        with self._condition:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def shutdown(self) -> None:
+        """Stop the poller and the upload workers"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._executor.shutdown(wait=False)
+
+    def _prepare(self, job: TranscriptionJob, use_cache: bool, preprocess: bool,
+                 segmented: Optional[bool], delete_audio: bool) -> None:
+        """Cache lookup, preprocessing, splitting and upload; runs on an upload worker"""
+        prepared = None
+        segment_paths = []  # Split outputs, deleted afterwards
+        try:
+            if use_cache:
+                job._cache_key = make_cache_key(hash_audio_file(job.audio_path), TRANSCRIPTION_SETTINGS)
+                cached = get_transcript_cache().get(job._cache_key)
+                if cached and cached.get('text'):
+                    self._finish(job, text=cached['text'], words=cached_word_index(job._cache_key),
+                                 transcript_ids=cached.get('transcript_ids', []))
+                    return
+
+            job._api_key = get_api_key("ASSEMBLYAI_API_KEY")
+            transcriber = get_transcriber(job._api_key, TRANSCRIPTION_SETTINGS)
+
+            upload_path = job.audio_path
+            if preprocess:
+                prepared = preprocess_audio(job.audio_path)
+                upload_path = prepared['path']
+                job._offset_seconds = prepared['offset_seconds']
+                print(f"{os.path.basename(job.audio_path)}: {format_savings(prepared)}")
+
+            if segmented is not False:
+                job._segments = plan_transcription_segments(upload_path, force=segmented is True)
+                if job._segments:
+                    segment_paths = split_audio(upload_path, job._segments)
+            paths = segment_paths or [upload_path]
+
+            scheduler = get_scheduler('assemblyai')
+            transcript_ids = []
+            for index, path in enumerate(paths):
+                label = f"Segment {index + 1} upload" if len(paths) > 1 else "Transcription upload"
+                with span('upload', bytes=os.path.getsize(path)):
+                    transcript = scheduler.call(lambda: transcriber.submit(path), label=label)
+                transcript_ids.append(transcript.id)
+
+            with self._condition:
+                job.transcript_ids = transcript_ids
+                job.submitted = time.time()
+                job.status = 'queued'
+                first_poll = time.monotonic() + self.min_poll_interval
+                job._pending = {transcript_id: first_poll for transcript_id in transcript_ids}
+                self._ensure_poller()
+                self._condition.notify_all()
+
+        except Exception as e:
+            print(f"Error submitting transcription: {str(e)}")
+            self._finish(job, error=str(e))
+
+        finally:
+            for path in segment_paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+            if prepared and prepared['processed'] and os.path.exists(prepared['path']):
+                os.unlink(prepared['path'])
+            if delete_audio and os.path.exists(job.audio_path):
+                os.unlink(job.audio_path)
+
+    def _poll_interval(self, job: TranscriptionJob) -> float:
+        """Short jobs are polled often, long-running ones less and less"""
+        age = time.time() - (job.submitted or job.created)
+        return min(self.max_poll_interval, max(self.min_poll_interval, age * POLL_INTERVAL_FRACTION))
+
+    def _ensure_poller(self) -> None:
+        if self._poller is None or not self._poller.is_alive():
+            self._poller = threading.Thread(target=self._poll_loop, name="transcription-poller", daemon=True)
+            self._poller.start()
+
+    def _poll_loop(self) -> None:
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = []
+                next_poll = None
+                for job in self._jobs.values():
+                    if job.done:
+                        continue
+                    for transcript_id, when in job._pending.items():
+                        if when <= now:
+                            due.append((job, transcript_id))
+                        elif next_poll is None or when < next_poll:
+                            next_poll = when
+                if not due:
+                    if next_poll is None and not any(j.status == 'preparing' for j in self._jobs.values()):
+                        # Nothing left to watch; submit() starts a new poller
+                        self._poller = None
+                        return
+                    self._condition.wait(None if next_poll is None else next_poll - now)
+                    continue
+
+            for job, transcript_id in due:
+                try:
+                    self._poll(job, transcript_id)
+                except Exception as e:
+                    # One bad poll must not stop the poller that every job shares
+                    print(f"Polling transcript {transcript_id} failed unexpectedly: {str(e)}")
+
+    def _poll(self, job: TranscriptionJob, transcript_id: str) -> None:
+        """Check one transcript once and record the outcome"""
+        scheduler = get_scheduler('assemblyai')
+        try:
+            scheduler.acquire()
+            response = aai.api.get_transcript(get_assemblyai_client(job._api_key).http_client, transcript_id)
+        except Exception as e:
+            delay = scheduler.retry_delay(e, min(job.polls, 6))
+            with self._condition:
+                # Another segment may have finished the job while this one was polled
+                if job.done or transcript_id not in job._pending:
+                    return
+                if delay is not None:
+                    job.polls += 1
+                    job._pending[transcript_id] = time.monotonic() + max(delay, self._poll_interval(job))
+            if delay is None:
+                self._finish(job, error=f"Transcription failed: {str(e)}")
+            else:
+                print(f"Polling transcript {transcript_id} failed: {str(e)}. Retrying in {delay:.1f}s...")
+            return
+
+        with self._condition:
+            if job.done or transcript_id not in job._pending:
+                return
+            job.polls += 1
+            if response.status == aai.TranscriptStatus.error:
+                error = f"Transcription failed: {response.error or 'Unknown error'}"
+            elif response.status == aai.TranscriptStatus.completed:
+                error = None
+                job._results[transcript_id] = response
+                del job._pending[transcript_id]
+                if job._pending:
+                    return
+            else:
+                if response.status == aai.TranscriptStatus.processing:
+                    job.status = 'processing'
+                job._pending[transcript_id] = time.monotonic() + self._poll_interval(job)
+                return
+
+        if error:
+            self._finish(job, error=error)
+            return
+
+        # Every transcript of the job is complete
+        try:
+            if job._segments:
+                responses = [job._results[transcript_id] for transcript_id in job.transcript_ids]
+                words = WordIndex.from_words(stitch_segments([word_dicts(r.words) for r in responses],
+                                                             job._segments, job._offset_seconds))
+                text = words.text
+            else:
+                response = job._results[job.transcript_ids[0]]
+                words = WordIndex.from_words(response.words, offset_ms=round(job._offset_seconds * 1000))
+                text = response.text
+            if not text:
+                raise Exception("Transcription returned empty text")
+            if job._cache_key:
+                cache = get_transcript_cache()
+                cache.put(job._cache_key, {'text': text, 'transcript_ids': job.transcript_ids})
+                if len(words):
+                    cache.put_words(job._cache_key, words.to_bytes())
+            self._finish(job, text=text, words=words, transcript_ids=job.transcript_ids)
+        except Exception as e:
+            self._finish(job, error=str(e))
+
+    def _finish(self, job: TranscriptionJob, text: Optional[str] = None, error: Optional[str] = None,
+                words: Optional[WordIndex] = None, transcript_ids: Optional[List[str]] = None) -> None:
+        with self._condition:
+            job.text = text
+            job.words = words
+            job.error = error
+            if transcript_ids is not None:
+                job.transcript_ids = list(transcript_ids)
+            job.status = 'error' if error else 'completed'
+            job.finished = time.time()
+            job._pending = {}
+            job._results = {}
+            self._condition.notify_all()
+
+        # From submit() to the finished transcript, including time spent in AssemblyAI's queue
+        get_metrics().record('transcription', job.finished - job.created, error=bool(error),
+                             segments=len(job.transcript_ids), polls=job.polls,
+                             characters=len(text) if text else 0)
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention period (caller holds the lock)"""
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager shared by all sessions"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(submit_workers=int(os.getenv("LECTUREAI_SUBMIT_WORKERS", SUBMIT_WORKERS)))
+        return _job_manager
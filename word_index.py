@@ -0,0 +1,240 @@
+"""
+Compact word-timestamp index
+Keeps AssemblyAI's word-level timing in parallel arrays (word id, start,
+end, confidence) with an interned word table, instead of one Python object
+per word. Supports looking up the text at a time and the times of a
+phrase with bisect, and serializes to a small binary file.
+"""
+
+import re
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional, List, Tuple, Dict, Iterable, Any
+
+MAGIC = b'LAIW'
+VERSION = 1
+_HEADER = struct.Struct('<4sHII')  # magic, version, word count, vocabulary size
+CONFIDENCE_SCALE = 10000  # Confidences are stored as 0..10000
+
+_NON_WORD = re.compile(r"[^\w']+")
+
+def normalize_word(word: str) -> str:
+    """Lowercase a word and strip surrounding punctuation, for text lookups"""
+    return _NON_WORD.sub('', word.lower()).strip("'")
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _read_array(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+class WordIndex:
+    """
+    Words of a transcript with their timestamps in milliseconds
+
+    Words are stored in time order. Each distinct spelling is stored once
+    in the word table; the per-word arrays hold only integers.
+    """
+
+    def __init__(self):
+        self.vocab: List[str] = []
+        self._vocab_ids: Dict[str, int] = {}
+        self.word_ids = array('I')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.confidences = array('H')
+        self._order: Optional[array] = None  # Word positions sorted by normalized text
+        self._order_keys: Optional[List[str]] = None
+
+    @classmethod
+    def from_words(cls, words: Iterable[Any], offset_ms: int = 0) -> 'WordIndex':
+        """
+        Build an index from AssemblyAI words
+
+        Args:
+            words: aai.Word objects or dicts with text, start, end and confidence
+            offset_ms: Added to every timestamp (e.g. audio trimmed before upload)
+
+        Returns:
+            New WordIndex
+        """
+        index = cls()
+        for word in words or []:
+            if isinstance(word, dict):
+                text, start, end, confidence = word['text'], word['start'], word['end'], word.get('confidence')
+            else:
+                text, start, end, confidence = word.text, word.start, word.end, word.confidence
+            index.append(text, start + offset_ms, end + offset_ms, confidence)
+        return index
+
+    def append(self, text: str, start: int, end: int, confidence: Optional[float] = None) -> None:
+        """Add a word after the last one"""
+        word_id = self._vocab_ids.get(text)
+        if word_id is None:
+            word_id = self._vocab_ids[text] = len(self.vocab)
+            self.vocab.append(text)
+        self.word_ids.append(word_id)
+        self.starts.append(max(0, int(start)))
+        self.ends.append(max(0, int(end)))
+        self.confidences.append(int(round((confidence if confidence is not None else 1.0) * CONFIDENCE_SCALE)))
+        self._order = None
+
+    def __len__(self) -> int:
+        return len(self.word_ids)
+
+    def __getitem__(self, position: int) -> Tuple[str, int, int, float]:
+        """(text, start ms, end ms, confidence) of the word at a position"""
+        return (self.vocab[self.word_ids[position]], self.starts[position], self.ends[position],
+                self.confidences[position] / CONFIDENCE_SCALE)
+
+    @property
+    def text(self) -> str:
+        """The transcript text rebuilt from the words"""
+        return ' '.join(self.vocab[word_id] for word_id in self.word_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the arrays and the word table"""
+        arrays = sum(a.itemsize * len(a) for a in (self.word_ids, self.starts, self.ends, self.confidences))
+        return arrays + sum(len(word.encode('utf-8')) for word in self.vocab)
+
+    def position_at(self, ms: int) -> Optional[int]:
+        """
+        Position of the word being spoken at a time
+
+        Between two words, the word that started last is returned.
+
+        Args:
+            ms: Time in milliseconds
+
+        Returns:
+            Word position, or None before the first word
+        """
+        position = bisect_right(self.starts, ms) - 1
+        return position if position >= 0 else None
+
+    def text_between(self, start_ms: int, end_ms: int) -> str:
+        """
+        Text of the words starting within a time range
+
+        Args:
+            start_ms: Range start in milliseconds (inclusive)
+            end_ms: Range end in milliseconds (exclusive)
+
+        Returns:
+            The words joined with spaces
+        """
+        first = bisect_left(self.starts, start_ms)
+        last = bisect_left(self.starts, end_ms)
+        return ' '.join(self.vocab[self.word_ids[i]] for i in range(first, last))
+
+    def _build_order(self) -> None:
+        normalized = [normalize_word(word) for word in self.vocab]
+        keys = [normalized[word_id] for word_id in self.word_ids]
+        self._order = array('I', sorted(range(len(keys)), key=keys.__getitem__))
+        self._order_keys = [keys[position] for position in self._order]
+
+    def positions_of(self, word: str) -> List[int]:
+        """Positions of every occurrence of a word (case and punctuation ignored)"""
+        if self._order is None:
+            self._build_order()
+        key = normalize_word(word)
+        first = bisect_left(self._order_keys, key)
+        last = bisect_right(self._order_keys, key)
+        return sorted(self._order[first:last])
+
+    def find(self, phrase: str) -> List[Tuple[int, int]]:
+        """
+        Times at which a word or phrase is spoken
+
+        Args:
+            phrase: One or more words (case and punctuation ignored)
+
+        Returns:
+            (start ms, end ms) of every occurrence, in time order
+        """
+        terms = [normalize_word(term) for term in phrase.split()]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+
+        matches = []
+        for position in self.positions_of(terms[0]):
+            end = position + len(terms)
+            if end > len(self.word_ids):
+                continue
+            if all(normalize_word(self.vocab[self.word_ids[position + i]]) == terms[i]
+                   for i in range(1, len(terms))):
+                matches.append((self.starts[position], self.ends[end - 1]))
+        return matches
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index (little-endian arrays plus a compressed word table)"""
+        vocab_blob = zlib.compress('\n'.join(self.vocab).encode('utf-8'))
+        return b''.join([
+            _HEADER.pack(MAGIC, VERSION, len(self.word_ids), len(self.vocab)),
+            _little_endian(self.word_ids),
+            _little_endian(self.starts),
+            _little_endian(self.ends),
+            _little_endian(self.confidences),
+            vocab_blob,
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'WordIndex':
+        """
+        Load an index written by to_bytes
+
+        Raises:
+            ValueError if the data is not a word index, or is truncated or corrupt
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Not a word index: data too short")
+        magic, version, count, vocab_size = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a word index or unsupported version")
+
+        array_bytes = count * sum(array(typecode).itemsize for typecode in 'IIIH')
+        if len(data) < _HEADER.size + array_bytes:
+            raise ValueError(f"Corrupt word index: {count} words need {array_bytes} bytes, "
+                             f"{len(data) - _HEADER.size} stored")
+
+        index = cls()
+        offset = _HEADER.size
+        for name, typecode in (('word_ids', 'I'), ('starts', 'I'), ('ends', 'I'), ('confidences', 'H')):
+            size = count * array(typecode).itemsize
+            setattr(index, name, _read_array(typecode, data[offset:offset + size]))
+            offset += size
+
+        try:
+            vocab_text = zlib.decompress(data[offset:]).decode('utf-8')
+        except zlib.error as e:
+            raise ValueError(f"Corrupt word index: {str(e)}")
+        index.vocab = vocab_text.split('\n') if vocab_size else []
+        if len(index.vocab) != vocab_size:
+            raise ValueError("Corrupt word index: word table size mismatch")
+        if count and max(index.word_ids) >= vocab_size:
+            raise ValueError("Corrupt word index: word id outside the word table")
+        index._vocab_ids = {word: word_id for word_id, word in enumerate(index.vocab)}
+        return index
+
+    def save(self, path: str) -> None:
+        """Write the index to a file"""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'WordIndex':
+        """Read an index written by save"""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())